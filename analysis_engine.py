@@ -5,24 +5,124 @@ Calculates all metrics and generates JSON for website.
 
 import pandas as pd
 import numpy as np
-import json
+import orjson
 from pathlib import Path
 from datetime import datetime, date
 from decimal import Decimal
+from types import MappingProxyType
 from typing import Dict, List, Any, Optional
-from collections import defaultdict
-
-def clean_for_json(obj):
-    """Convert NaN and inf values to None for JSON compatibility."""
-    if isinstance(obj, dict):
-        return {k: clean_for_json(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [clean_for_json(item) for item in obj]
-    elif isinstance(obj, float):
-        if np.isnan(obj) or np.isinf(obj):
-            return None
-        return obj
-    return obj
+from dataclasses import dataclass
+from utils import read_export
+
+# Quarterly/annual fundamentals summed for LTM and used for growth rates
+LTM_COLS = ['revenue', 'gross_profit', 'net_income', 'operating_cash_flow', 'free_cash_flow']
+
+# Key prefix used in the growth section for each fundamental
+GROWTH_PREFIXES = {
+    'revenue': 'revenue',
+    'gross_profit': 'gross_profit',
+    'net_income': 'net_income',
+    'operating_cash_flow': 'ocf',
+    'free_cash_flow': 'fcf',
+}
+
+# Columns read from each export CSV (optional ones are skipped when a file
+# does not have them)
+STOCK_COLS = ['symbol', 'company_name', 'exchange', 'sector', 'industry']
+PRICE_COLS = ['symbol', 'last_close_price', 'price_3m_ago', 'week_52_high', 'week_52_low']
+QUARTERLY_COLS = ['symbol', 'fiscal_year', 'fiscal_quarter', 'quarter_end_date',
+                  *LTM_COLS, 'capital_expenditure']
+ANNUAL_COLS = ['symbol', 'fiscal_year', *LTM_COLS, 'capital_expenditure']
+VALUATION_COLS = ['symbol', 'market_cap', 'total_debt', 'total_cash', 'book_value',
+                  'balance_sheet_date']
+
+# Fields of the per-stock history records in the website output
+ANNUAL_HISTORY_COLS = ['fiscal_year', 'revenue', 'gross_profit', 'net_income',
+                       'operating_cash_flow', 'capital_expenditure', 'free_cash_flow']
+QUARTERLY_HISTORY_COLS = ['fiscal_year', 'fiscal_quarter', 'quarter_end_date', 'revenue',
+                          'gross_profit', 'net_income', 'operating_cash_flow',
+                          'capital_expenditure', 'free_cash_flow']
+
+# Metrics summarized per sector/industry: stat name -> (section, key)
+AGGREGATE_METRICS = {
+    'pe': ('valuation', 'pe_ltm'),
+    'pb': ('valuation', 'pb'),
+    'ev_fcf': ('valuation', 'ev_fcf'),
+    'revenue_cagr_3y': ('growth', 'revenue_cagr_3y'),
+    'net_margin': ('margins', 'net_ltm'),
+    'volatility': ('price', 'volatility'),
+}
+
+
+# Fixed-shape sections of a stock record. __slots__ drops the per-instance
+# __dict__; orjson serializes these dataclasses as objects directly. The price
+# section stays a dict because its keys ('52w_high', ...) are not identifiers,
+# and growth keys depend on how many years of history a stock has.
+@dataclass
+class Valuation:
+    __slots__ = ('market_cap', 'enterprise_value', 'total_debt', 'total_cash',
+                 'balance_sheet_date', 'pe_ltm', 'pb', 'ev_fcf', 'peg')
+    market_cap: Optional[float]
+    enterprise_value: Optional[float]
+    total_debt: Optional[float]
+    total_cash: Optional[float]
+    balance_sheet_date: Any
+    pe_ltm: Optional[float]
+    pb: Optional[float]
+    ev_fcf: Optional[float]
+    peg: Optional[float]
+
+
+@dataclass
+class Margins:
+    __slots__ = ('gross_ltm', 'gross_trend', 'net_ltm', 'net_trend',
+                 'ocf_ltm', 'ocf_trend', 'fcf_ltm', 'fcf_trend')
+    gross_ltm: Optional[float]
+    gross_trend: str
+    net_ltm: Optional[float]
+    net_trend: str
+    ocf_ltm: Optional[float]
+    ocf_trend: str
+    fcf_ltm: Optional[float]
+    fcf_trend: str
+
+
+@dataclass
+class Quality:
+    __slots__ = ('net_income_consistency', 'fcf_consistency')
+    net_income_consistency: Optional[float]
+    fcf_consistency: Optional[float]
+
+
+# Margin type -> numerator column (denominator is always revenue)
+MARGIN_NUMERATORS = MappingProxyType({
+    'gross': 'gross_profit',
+    'net': 'net_income',
+    'ocf': 'operating_cash_flow',
+    'fcf': 'free_cash_flow',
+})
+
+# Column of each margin type in the trend code matrix, and the label per code
+_MARGIN_TO_IDX = MappingProxyType({margin_type: i for i, margin_type in enumerate(MARGIN_NUMERATORS)})
+_TREND_LABELS = ('unknown', 'flat', 'expanding', 'contracting')
+
+def _cagr_vec(start: np.ndarray, end: np.ndarray, years: int) -> np.ndarray:
+    """
+    Compound Annual Growth Rate (%) element-wise.
+
+    NaN where start <= 0, end == 0, end/start <= 0 or either value is missing.
+    """
+    ratio = np.divide(end, start, out=np.full_like(end, np.nan), where=(start > 0) & (end != 0))
+    growth = np.power(ratio, 1 / years, out=np.full_like(ratio, np.nan), where=ratio > 0)
+    return np.round((growth - 1) * 100, 2)
+
+
+def _yoy_vec(current: np.ndarray, previous: np.ndarray) -> np.ndarray:
+    """Year-over-Year growth (%) element-wise, NaN where previous is zero or missing."""
+    growth = np.divide(current - previous, np.abs(previous),
+                       out=np.full_like(current, np.nan), where=previous != 0)
+    return np.round(growth * 100, 2)
+
 
 class StockAnalyzer:
     """Calculate all metrics for stock screening and analysis."""
@@ -32,78 +132,221 @@ class StockAnalyzer:
         print("Loading data files...")
 
         # Load CSV files
-        self.stocks_df = pd.read_csv('exports/stocks.csv')
-        self.prices_df = pd.read_csv('exports/price_history.csv')
-        self.quarterly_df = pd.read_csv('exports/quarterly_fundamentals.csv')
-        self.annual_df = pd.read_csv('exports/annual_fundamentals.csv')
+        self.stocks_df = read_export('exports/stocks.csv', STOCK_COLS)
+        self.prices_df = read_export('exports/price_history.csv', PRICE_COLS)
+        self.quarterly_df = read_export('exports/quarterly_fundamentals.csv', QUARTERLY_COLS)
+        self.annual_df = read_export('exports/annual_fundamentals.csv', ANNUAL_COLS)
 
         # Load valuation data (check if exists)
         val_path = Path('exports/valuation_data.csv')
         if val_path.exists():
-            self.valuation_df = pd.read_csv(val_path)
+            self.valuation_df = read_export(val_path, VALUATION_COLS)
         else:
             print("Warning: valuation_data.csv not found. Will use None for valuation metrics.")
             self.valuation_df = None
 
+        # Sort once (most recent period first, the order the history output
+        # uses) and index every frame by symbol so the per-stock helpers do a
+        # dict/index lookup instead of re-scanning or re-sorting the frames
+        self.quarterly_df = self.quarterly_df.sort_values(
+            ['symbol', 'quarter_end_date'], ascending=[True, False]).reset_index(drop=True)
+        self.annual_df = self.annual_df.sort_values(
+            ['symbol', 'fiscal_year'], ascending=[True, False]).reset_index(drop=True)
+
+        self._annual_history = self._history_records(
+            self.annual_df, ANNUAL_HISTORY_COLS, min_year=2021)
+        self._quarterly_history = self._history_records(
+            self.quarterly_df, QUARTERLY_HISTORY_COLS, min_year=2024)
+
+        self._precompute_price_stats()
+
+        # Per-symbol rows as plain dicts: O(1) lookups with no Series boxing
+        self._stock_row = self.stocks_df.set_index('symbol', drop=False).to_dict(orient='index')
+        self._price_row = self.prices_df.set_index('symbol', drop=False).to_dict(orient='index')
+        self._val_row = (self.valuation_df.set_index('symbol', drop=False).to_dict(orient='index')
+                         if self.valuation_df is not None else {})
+
+        self._build_matrices()
+        self._precompute_metrics()
+
         print(f"Loaded {len(self.stocks_df)} stocks")
 
-    def calculate_ltm(self, symbol: str, metric: str) -> Optional[float]:
+    def _precompute_price_stats(self):
         """
-        Calculate Last Twelve Months (LTM) value for a metric.
+        Add 52-week ratio, percentile, volatility and position momentum
+        columns to prices_df, computed for all symbols in one vectorized pass.
+        """
+        prices = self.prices_df
+        current = prices['last_close_price'].to_numpy(dtype=np.float64)
+        price_3m = prices['price_3m_ago'].to_numpy(dtype=np.float64)
+        high = prices['week_52_high'].to_numpy(dtype=np.float64)
+        low = prices['week_52_low'].to_numpy(dtype=np.float64)
+
+        span = high - low
+        avg_price = (high + low) / 2
+        has_current = ~np.isnan(current)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Position within the 52-week range; 50 when the range is flat
+            percentile = np.where(span != 0, (current - low) / span * 100, 50.0)
+            percentile_3m = np.where(span != 0, (price_3m - low) / span * 100, 50.0)
+            percentile[~has_current | np.isnan(span)] = np.nan
+            percentile_3m[np.isnan(price_3m) | np.isnan(span)] = np.nan
+
+            prices['ratio_52w'] = np.round(np.where(low > 0, high / low, np.nan), 2)
+            prices['percentile_52w'] = np.round(percentile, 2)
+            prices['volatility'] = np.round(np.where(avg_price > 0, span / avg_price, np.nan), 3)
+            prices['position_momentum'] = np.round(percentile - percentile_3m, 2)
+
+    def _build_matrices(self):
+        """
+        Pivot quarterly and annual fundamentals into dense
+        (n_symbols x n_periods) float64 matrices, one per metric.
+
+        Rows follow stocks_df (see _sym_to_idx). Quarterly matrices are
+        right-aligned so column -1 is each symbol's latest quarter; annual
+        matrices are left-aligned so column 0 is the latest fiscal year.
+        Missing periods are NaN.
+        """
+        self._symbols = pd.Index(self.stocks_df['symbol'])
+        self._sym_to_idx = {sym: i for i, sym in enumerate(self._symbols)}
+        n_symbols = len(self._symbols)
+
+        q = self.quarterly_df
+        q_rows = self._symbols.get_indexer(q['symbol'])
+        q_from_end = q.groupby('symbol', sort=False, observed=True).cumcount().to_numpy()
+        known = q_rows >= 0
+        self._q_counts = np.bincount(q_rows[known], minlength=n_symbols)
+        n_quarters = max(int(self._q_counts.max(initial=0)), 1)
+        q_cols = n_quarters - 1 - q_from_end
+
+        a = self.annual_df
+        a_rows = self._symbols.get_indexer(a['symbol'])
+        a_cols = a.groupby('symbol', sort=False, observed=True).cumcount().to_numpy()
+        a_known = a_rows >= 0
+        self._a_counts = np.bincount(a_rows[a_known], minlength=n_symbols)
+        n_years = max(int(self._a_counts.max(initial=0)), 5)
+
+        self._q_mat = {}
+        self._a_mat = {}
+        for metric in LTM_COLS:
+            mat = np.full((n_symbols, n_quarters), np.nan)
+            mat[q_rows[known], q_cols[known]] = q[metric].to_numpy(dtype=np.float64)[known]
+            self._q_mat[metric] = mat
+
+            mat = np.full((n_symbols, n_years), np.nan)
+            mat[a_rows[a_known], a_cols[a_known]] = a[metric].to_numpy(dtype=np.float64)[a_known]
+            self._a_mat[metric] = mat
+
+    def _precompute_metrics(self):
+        """
+        Calculate LTM sums, margin trends and growth rates for every symbol
+        at once as vectorized expressions over the metric matrices.
+        """
+        has_4q = self._q_counts >= 4
+        has_8q = self._q_counts >= 8
+
+        # LTM: sum of the last 4 quarters, NaN if all 4 are missing
+        self._ltm = {}
+        for metric, mat in self._q_mat.items():
+            last_4q = mat[:, -4:]
+            missing = np.isnan(last_4q).all(axis=1) | ~has_4q
+            self._ltm[metric] = np.where(missing, np.nan, np.nansum(last_4q, axis=1))
+
+        # Margin trends: recent 4Q vs prior 4Q for symbols with 8+ quarters
+        recent_rev = np.nansum(self._q_mat['revenue'][:, -4:], axis=1)
+        prior_rev = np.nansum(self._q_mat['revenue'][:, -8:-4], axis=1)
+
+        self._trend_codes = np.zeros((len(self._symbols), len(MARGIN_NUMERATORS)), dtype=np.int8)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for margin_type, numerator in MARGIN_NUMERATORS.items():
+                mat = self._q_mat[numerator]
+                recent_margin = np.where(recent_rev > 0, np.nansum(mat[:, -4:], axis=1) / recent_rev * 100, np.nan)
+                prior_margin = np.where(prior_rev > 0, np.nansum(mat[:, -8:-4], axis=1) / prior_rev * 100, np.nan)
+                diff = np.where(has_8q, recent_margin - prior_margin, np.nan)
+                # Codes index _TREND_LABELS
+                self._trend_codes[:, _MARGIN_TO_IDX[margin_type]] = np.select(
+                    [diff > 2, diff < -2, ~np.isnan(diff)], [2, 3, 1], 0)
+
+        # Growth consistency: std dev of quarterly YoY growth rates (each
+        # quarter vs 4 quarters earlier), skipping missing and zero year-ago
+        # values; needs 8+ quarters and at least 3 growth rates
+        self._consistency = {}
+        for metric, mat in self._q_mat.items():
+            current = mat[:, 4:]
+            year_ago = mat[:, :-4]
+            valid = ~np.isnan(current) & ~np.isnan(year_ago) & (year_ago != 0)
+            growth = np.divide(current - year_ago, np.abs(year_ago),
+                               out=np.full_like(current, np.nan), where=valid) * 100
+
+            n_valid = valid.sum(axis=1)
+            divisor = np.maximum(n_valid, 1)
+            mean = np.nansum(growth, axis=1) / divisor
+            std = np.sqrt(np.nansum((growth - mean[:, None]) ** 2, axis=1) / divisor)
+            self._consistency[metric] = np.where(has_8q & (n_valid >= 3), np.round(std, 2), np.nan)
+
+        # Growth: column 0 is the current year and column n is n years ago
+        self._growth = {}
+        for col, prefix in GROWTH_PREFIXES.items():
+            mat = self._a_mat[col]
+            self._growth[f'{prefix}_cagr_3y'] = _cagr_vec(mat[:, 3], mat[:, 0], 3)
+        for col, prefix in GROWTH_PREFIXES.items():
+            mat = self._a_mat[col]
+            self._growth[f'{prefix}_cagr_4y'] = _cagr_vec(mat[:, 4], mat[:, 0], 4)
+        for col, prefix in GROWTH_PREFIXES.items():
+            mat = self._a_mat[col]
+            self._growth[f'{prefix}_yoy'] = _yoy_vec(mat[:, 0], mat[:, 1])
+
+    @staticmethod
+    def _history_records(df: pd.DataFrame, columns: List[str], min_year: int) -> Dict[str, List[Dict]]:
+        """
+        Build the per-symbol history records for the website in one pass.
 
         Args:
-            symbol: Stock symbol
-            metric: Metric name (revenue, net_income, etc.)
+            df: Fundamentals frame, sorted by symbol and most recent period first
+            columns: Record fields (missing columns are filled with NaN)
+            min_year: First fiscal year to include
 
         Returns:
-            LTM value or None
+            Dict of symbol -> list of records
         """
-        # Get last 4 quarters for this symbol
-        stock_quarters = self.quarterly_df[
-            self.quarterly_df['symbol'] == symbol
-        ].sort_values('quarter_end_date', ascending=False).head(4)
+        recent = df[df['fiscal_year'] >= min_year]
+        records = recent.reindex(columns=columns).to_dict(orient='records')
 
-        if len(stock_quarters) < 4:
-            return None
+        history = {}
+        for symbol, record in zip(recent['symbol'], records):
+            history.setdefault(symbol, []).append(record)
+        return history
 
-        # Sum the metric across 4 quarters
-        values = stock_quarters[metric].dropna()
-        if len(values) == 0:
-            return None
-
-        return values.sum() if len(values) > 0 else None
-
-    def calculate_cagr(self, start_value: float, end_value: float, years: int) -> Optional[float]:
+    def calculate_ltm(self, symbol: str, metric: str) -> Optional[float]:
         """
-        Calculate Compound Annual Growth Rate.
+        Calculate Last Twelve Months (LTM) value for a metric.
 
         Args:
-            start_value: Starting value
-            end_value: Ending value
-            years: Number of years
+            symbol: Stock symbol
+            metric: Metric name (revenue, net_income, etc.)
 
         Returns:
-            CAGR as percentage or None
+            LTM value or None (fewer than 4 quarters or no data)
         """
-        if not start_value or not end_value or start_value <= 0 or years <= 0:
+        idx = self._sym_to_idx.get(symbol)
+        if idx is None:
             return None
 
-        try:
-            cagr = ((end_value / start_value) ** (1 / years) - 1) * 100
-            return round(cagr, 2)
-        except:
-            return None
+        value = self._ltm[metric][idx]
+        return None if np.isnan(value) else value
 
-    def calculate_yoy_growth(self, current: float, previous: float) -> Optional[float]:
-        """Calculate Year-over-Year growth percentage."""
-        if not previous or previous == 0:
-            return None
+    def _ltm_bundle(self, symbol: str) -> Dict[str, Optional[float]]:
+        """LTM values for every metric in LTM_COLS with a single symbol lookup."""
+        idx = self._sym_to_idx.get(symbol)
+        if idx is None:
+            return dict.fromkeys(LTM_COLS)
 
-        try:
-            growth = ((current - previous) / abs(previous)) * 100
-            return round(growth, 2)
-        except:
-            return None
+        bundle = {}
+        for metric in LTM_COLS:
+            value = self._ltm[metric][idx]
+            bundle[metric] = None if np.isnan(value) else value
+        return bundle
 
     def calculate_margin_trend(self, symbol: str, margin_type: str) -> str:
         """
@@ -114,49 +357,23 @@ class StockAnalyzer:
             margin_type: 'gross', 'net', 'ocf', or 'fcf'
 
         Returns:
-            'expanding', 'flat', or 'contracting'
+            'expanding', 'flat', 'contracting' or 'unknown'
         """
-        # Get last 8 quarters
-        stock_quarters = self.quarterly_df[
-            self.quarterly_df['symbol'] == symbol
-        ].sort_values('quarter_end_date', ascending=False).head(8)
-
-        if len(stock_quarters) < 8:
+        col = _MARGIN_TO_IDX.get(margin_type)
+        idx = self._sym_to_idx.get(symbol)
+        if col is None or idx is None:
             return 'unknown'
 
-        # Split into recent 4Q and prior 4Q
-        recent_4q = stock_quarters.head(4)
-        prior_4q = stock_quarters.tail(4)
-
-        # Calculate margins
-        if margin_type == 'gross':
-            numerator = 'gross_profit'
-        elif margin_type == 'net':
-            numerator = 'net_income'
-        elif margin_type == 'ocf':
-            numerator = 'operating_cash_flow'
-        elif margin_type == 'fcf':
-            numerator = 'free_cash_flow'
-        else:
-            return 'unknown'
+        return _TREND_LABELS[self._trend_codes[idx, col]]
 
-        # Calculate average margins
-        recent_margin = (recent_4q[numerator].sum() / recent_4q['revenue'].sum() * 100
-                        if recent_4q['revenue'].sum() > 0 else None)
-        prior_margin = (prior_4q[numerator].sum() / prior_4q['revenue'].sum() * 100
-                       if prior_4q['revenue'].sum() > 0 else None)
+    def _all_margin_trends(self, symbol: str) -> Dict[str, str]:
+        """Margin trend for every margin type with a single symbol lookup."""
+        idx = self._sym_to_idx.get(symbol)
+        if idx is None:
+            return dict.fromkeys(MARGIN_NUMERATORS, 'unknown')
 
-        if recent_margin is None or prior_margin is None:
-            return 'unknown'
-
-        diff = recent_margin - prior_margin
-
-        if diff > 2:
-            return 'expanding'
-        elif diff < -2:
-            return 'contracting'
-        else:
-            return 'flat'
+        codes = self._trend_codes[idx]
+        return {margin_type: _TREND_LABELS[codes[col]] for margin_type, col in _MARGIN_TO_IDX.items()}
 
     def calculate_consistency(self, symbol: str, metric: str) -> Optional[float]:
         """
@@ -170,28 +387,12 @@ class StockAnalyzer:
         Returns:
             Standard deviation or None
         """
-        # Get quarterly data sorted by date
-        quarters = self.quarterly_df[
-            self.quarterly_df['symbol'] == symbol
-        ].sort_values('quarter_end_date')
-
-        if len(quarters) < 8:  # Need at least 2 years
+        idx = self._sym_to_idx.get(symbol)
+        if idx is None:
             return None
 
-        # Calculate YoY growth for each quarter
-        yoy_growths = []
-        for i in range(4, len(quarters)):
-            current = quarters.iloc[i][metric]
-            year_ago = quarters.iloc[i-4][metric]
-
-            if pd.notna(current) and pd.notna(year_ago) and year_ago != 0:
-                growth = ((current - year_ago) / abs(year_ago)) * 100
-                yoy_growths.append(growth)
-
-        if len(yoy_growths) < 3:
-            return None
-
-        return round(np.std(yoy_growths), 2)
+        consistency = self._consistency[metric][idx]
+        return None if np.isnan(consistency) else consistency
 
     def calculate_52w_position_momentum(self, symbol: str) -> Optional[float]:
         """
@@ -200,33 +401,8 @@ class StockAnalyzer:
         Returns:
             Change in percentile points (positive = improving)
         """
-        price_data = self.prices_df[self.prices_df['symbol'] == symbol].iloc[0]
-
-        # Current percentile
-        current_price = price_data['last_close_price']
-        high_52w = price_data['week_52_high']
-        low_52w = price_data['week_52_low']
-
-        if pd.isna(current_price) or pd.isna(high_52w) or pd.isna(low_52w):
-            return None
-
-        if high_52w == low_52w:
-            current_percentile = 50
-        else:
-            current_percentile = ((current_price - low_52w) / (high_52w - low_52w)) * 100
-
-        # 3-month ago percentile
-        price_3m = price_data['price_3m_ago']
-        if pd.isna(price_3m):
-            return None
-
-        if high_52w == low_52w:
-            ago_percentile = 50
-        else:
-            ago_percentile = ((price_3m - low_52w) / (high_52w - low_52w)) * 100
-
-        momentum = current_percentile - ago_percentile
-        return round(momentum, 2)
+        momentum = self._price_row[symbol]['position_momentum']
+        return None if np.isnan(momentum) else momentum
 
     def analyze_stock(self, symbol: str) -> Dict[str, Any]:
         """
@@ -236,71 +412,34 @@ class StockAnalyzer:
             symbol: Stock symbol
 
         Returns:
-            Dict with all calculated metrics
+            Dict with all calculated metrics; the valuation, margins and
+            quality sections are Valuation/Margins/Quality records
         """
         # Get base data
-        stock_info = self.stocks_df[self.stocks_df['symbol'] == symbol].iloc[0]
-        price_data = self.prices_df[self.prices_df['symbol'] == symbol].iloc[0]
+        stock_info = self._stock_row[symbol]
+        price_data = self._price_row[symbol]
 
         # Get valuation data if available
-        if self.valuation_df is not None:
-            val_row = self.valuation_df[self.valuation_df['symbol'] == symbol]
-            if not val_row.empty:
-                val_data = val_row.iloc[0]
-                market_cap = val_data.get('market_cap')
-                total_debt = val_data.get('total_debt', 0)
-                total_cash = val_data.get('total_cash', 0)
-                book_value = val_data.get('book_value')
-                balance_sheet_date = val_data.get('balance_sheet_date')
-            else:
-                market_cap = None
-                total_debt = 0
-                total_cash = 0
-                book_value = None
-                balance_sheet_date = None
-        else:
-            market_cap = None
-            total_debt = 0
-            total_cash = 0
-            book_value = None
-            balance_sheet_date = None
+        val_data = self._val_row.get(symbol, {})
+        market_cap = val_data.get('market_cap')
+        total_debt = val_data.get('total_debt', 0)
+        total_cash = val_data.get('total_cash', 0)
+        book_value = val_data.get('book_value')
+        balance_sheet_date = val_data.get('balance_sheet_date')
 
         # Calculate LTM metrics
-        ltm_revenue = self.calculate_ltm(symbol, 'revenue')
-        ltm_gross_profit = self.calculate_ltm(symbol, 'gross_profit')
-        ltm_net_income = self.calculate_ltm(symbol, 'net_income')
-        ltm_ocf = self.calculate_ltm(symbol, 'operating_cash_flow')
-        ltm_fcf = self.calculate_ltm(symbol, 'free_cash_flow')
-
-        # Get annual data for CAGR calculations
-        annual_data = self.annual_df[
-            self.annual_df['symbol'] == symbol
-        ].sort_values('fiscal_year', ascending=False)
+        ltm = self._ltm_bundle(symbol)
+        ltm_revenue = ltm['revenue']
+        ltm_gross_profit = ltm['gross_profit']
+        ltm_net_income = ltm['net_income']
+        ltm_ocf = ltm['operating_cash_flow']
+        ltm_fcf = ltm['free_cash_flow']
 
         # Price metrics
         current_price = price_data['last_close_price']
         high_52w = price_data['week_52_high']
         low_52w = price_data['week_52_low']
 
-        # Calculate 52w ratio
-        ratio_52w = round(high_52w / low_52w, 2) if (pd.notna(high_52w) and pd.notna(low_52w) and low_52w > 0) else None
-
-        # Calculate price percentile
-        if pd.notna(current_price) and pd.notna(high_52w) and pd.notna(low_52w):
-            if high_52w != low_52w:
-                percentile_52w = round(((current_price - low_52w) / (high_52w - low_52w)) * 100, 2)
-            else:
-                percentile_52w = 50.0
-        else:
-            percentile_52w = None
-
-        # Calculate volatility
-        if pd.notna(high_52w) and pd.notna(low_52w):
-            avg_price = (high_52w + low_52w) / 2
-            volatility = round((high_52w - low_52w) / avg_price, 3) if avg_price > 0 else None
-        else:
-            volatility = None
-
         # Valuation ratios
         pe_ltm = None
         pb = None
@@ -321,56 +460,15 @@ class StockAnalyzer:
             if ltm_fcf and ltm_fcf > 0:
                 ev_fcf = round(ev / ltm_fcf, 2)
 
-        # Growth calculations (CAGR)
+        # Growth calculations (CAGR, YoY), included once enough years exist
         growth_metrics = {}
-
-        if len(annual_data) >= 4:
-            # 3-year CAGR
-            current_year = annual_data.iloc[0]
-            year_3_ago = annual_data.iloc[3]
-
-            growth_metrics['revenue_cagr_3y'] = self.calculate_cagr(
-                year_3_ago['revenue'], current_year['revenue'], 3)
-            growth_metrics['gross_profit_cagr_3y'] = self.calculate_cagr(
-                year_3_ago['gross_profit'], current_year['gross_profit'], 3)
-            growth_metrics['net_income_cagr_3y'] = self.calculate_cagr(
-                year_3_ago['net_income'], current_year['net_income'], 3)
-            growth_metrics['ocf_cagr_3y'] = self.calculate_cagr(
-                year_3_ago['operating_cash_flow'], current_year['operating_cash_flow'], 3)
-            growth_metrics['fcf_cagr_3y'] = self.calculate_cagr(
-                year_3_ago['free_cash_flow'], current_year['free_cash_flow'], 3)
-
-        if len(annual_data) >= 5:
-            # 4-year CAGR
-            current_year = annual_data.iloc[0]
-            year_4_ago = annual_data.iloc[4]
-
-            growth_metrics['revenue_cagr_4y'] = self.calculate_cagr(
-                year_4_ago['revenue'], current_year['revenue'], 4)
-            growth_metrics['gross_profit_cagr_4y'] = self.calculate_cagr(
-                year_4_ago['gross_profit'], current_year['gross_profit'], 4)
-            growth_metrics['net_income_cagr_4y'] = self.calculate_cagr(
-                year_4_ago['net_income'], current_year['net_income'], 4)
-            growth_metrics['ocf_cagr_4y'] = self.calculate_cagr(
-                year_4_ago['operating_cash_flow'], current_year['operating_cash_flow'], 4)
-            growth_metrics['fcf_cagr_4y'] = self.calculate_cagr(
-                year_4_ago['free_cash_flow'], current_year['free_cash_flow'], 4)
-
-        if len(annual_data) >= 2:
-            # YoY growth
-            current_year = annual_data.iloc[0]
-            last_year = annual_data.iloc[1]
-
-            growth_metrics['revenue_yoy'] = self.calculate_yoy_growth(
-                current_year['revenue'], last_year['revenue'])
-            growth_metrics['gross_profit_yoy'] = self.calculate_yoy_growth(
-                current_year['gross_profit'], last_year['gross_profit'])
-            growth_metrics['net_income_yoy'] = self.calculate_yoy_growth(
-                current_year['net_income'], last_year['net_income'])
-            growth_metrics['ocf_yoy'] = self.calculate_yoy_growth(
-                current_year['operating_cash_flow'], last_year['operating_cash_flow'])
-            growth_metrics['fcf_yoy'] = self.calculate_yoy_growth(
-                current_year['free_cash_flow'], last_year['free_cash_flow'])
+        idx = self._sym_to_idx[symbol]
+        n_years = self._a_counts[idx]
+        for suffix, min_years in (('cagr_3y', 4), ('cagr_4y', 5), ('yoy', 2)):
+            if n_years >= min_years:
+                for prefix in GROWTH_PREFIXES.values():
+                    value = self._growth[f'{prefix}_{suffix}'][idx]
+                    growth_metrics[f'{prefix}_{suffix}'] = None if np.isnan(value) else value
 
         # PEG ratio
         peg = None
@@ -385,63 +483,14 @@ class StockAnalyzer:
         fcf_margin = round((ltm_fcf / ltm_revenue * 100), 2) if ltm_revenue and ltm_revenue > 0 else None
 
         # Margin trends
-        gross_trend = self.calculate_margin_trend(symbol, 'gross')
-        net_trend = self.calculate_margin_trend(symbol, 'net')
-        ocf_trend = self.calculate_margin_trend(symbol, 'ocf')
-        fcf_trend = self.calculate_margin_trend(symbol, 'fcf')
+        trends = self._all_margin_trends(symbol)
 
         # Quality metrics
         net_income_consistency = self.calculate_consistency(symbol, 'net_income')
         fcf_consistency = self.calculate_consistency(symbol, 'free_cash_flow')
 
-        # Position momentum
-        position_momentum = self.calculate_52w_position_momentum(symbol)
-
-        # Get historical annual data (2021-2024)
-        annual_history = []
-        for _, row in annual_data.iterrows():
-            if row['fiscal_year'] >= 2021:
-                # Check if capital_expenditure column exists
-                capex = None
-                if 'capital_expenditure' in row.index:
-                    capex = float(row['capital_expenditure']) if pd.notna(row['capital_expenditure']) else None
-
-                annual_history.append({
-                    'fiscal_year': int(row['fiscal_year']),
-                    'revenue': float(row['revenue']) if pd.notna(row['revenue']) else None,
-                    'gross_profit': float(row['gross_profit']) if pd.notna(row['gross_profit']) else None,
-                    'net_income': float(row['net_income']) if pd.notna(row['net_income']) else None,
-                    'operating_cash_flow': float(row['operating_cash_flow']) if pd.notna(row['operating_cash_flow']) else None,
-                    'capital_expenditure': capex,
-                    'free_cash_flow': float(row['free_cash_flow']) if pd.notna(row['free_cash_flow']) else None
-                })
-
-        # Get quarterly data for 2024-2025
-        quarterly_data = self.quarterly_df[
-            self.quarterly_df['symbol'] == symbol
-        ].sort_values('quarter_end_date', ascending=False)
-
-        quarterly_history = []
-        for _, row in quarterly_data.iterrows():
-            if row['fiscal_year'] >= 2024:
-                # Check if capital_expenditure column exists
-                capex = None
-                if 'capital_expenditure' in row.index:
-                    capex = float(row['capital_expenditure']) if pd.notna(row['capital_expenditure']) else None
-
-                quarterly_history.append({
-                    'fiscal_year': int(row['fiscal_year']),
-                    'fiscal_quarter': int(row['fiscal_quarter']),
-                    'quarter_end_date': str(row['quarter_end_date']),
-                    'revenue': float(row['revenue']) if pd.notna(row['revenue']) else None,
-                    'gross_profit': float(row['gross_profit']) if pd.notna(row['gross_profit']) else None,
-                    'net_income': float(row['net_income']) if pd.notna(row['net_income']) else None,
-                    'operating_cash_flow': float(row['operating_cash_flow']) if pd.notna(row['operating_cash_flow']) else None,
-                    'capital_expenditure': capex,
-                    'free_cash_flow': float(row['free_cash_flow']) if pd.notna(row['free_cash_flow']) else None
-                })
-
-        # Compile all metrics
+        # Compile all metrics. Missing values may be NaN; the orjson export
+        # writes them as null, so they are not converted here
         return {
             'symbol': symbol,
             'company_name': stock_info['company_name'],
@@ -450,48 +499,48 @@ class StockAnalyzer:
             'exchange': stock_info['exchange'],
 
             'price': {
-                'current': float(current_price) if pd.notna(current_price) else None,
-                '52w_high': float(high_52w) if pd.notna(high_52w) else None,
-                '52w_low': float(low_52w) if pd.notna(low_52w) else None,
-                '52w_ratio': ratio_52w,
-                'percentile_52w': percentile_52w,
-                'volatility': volatility,
-                'position_momentum': position_momentum
+                'current': current_price,
+                '52w_high': high_52w,
+                '52w_low': low_52w,
+                '52w_ratio': price_data['ratio_52w'],
+                'percentile_52w': price_data['percentile_52w'],
+                'volatility': price_data['volatility'],
+                'position_momentum': price_data['position_momentum']
             },
 
-            'valuation': {
-                'market_cap': float(market_cap) if market_cap else None,
-                'enterprise_value': float(ev) if ev else None,
-                'total_debt': float(total_debt) if total_debt else None,
-                'total_cash': float(total_cash) if total_cash else None,
-                'balance_sheet_date': balance_sheet_date,
-                'pe_ltm': pe_ltm,
-                'pb': pb,
-                'ev_fcf': ev_fcf,
-                'peg': peg
-            },
+            'valuation': Valuation(
+                market_cap=market_cap or None,
+                enterprise_value=ev or None,
+                total_debt=total_debt or None,
+                total_cash=total_cash or None,
+                balance_sheet_date=balance_sheet_date,
+                pe_ltm=pe_ltm,
+                pb=pb,
+                ev_fcf=ev_fcf,
+                peg=peg
+            ),
 
             'growth': growth_metrics,
 
-            'margins': {
-                'gross_ltm': gross_margin,
-                'gross_trend': gross_trend,
-                'net_ltm': net_margin,
-                'net_trend': net_trend,
-                'ocf_ltm': ocf_margin,
-                'ocf_trend': ocf_trend,
-                'fcf_ltm': fcf_margin,
-                'fcf_trend': fcf_trend
-            },
-
-            'quality': {
-                'net_income_consistency': net_income_consistency,
-                'fcf_consistency': fcf_consistency
-            },
+            'margins': Margins(
+                gross_ltm=gross_margin,
+                gross_trend=trends['gross'],
+                net_ltm=net_margin,
+                net_trend=trends['net'],
+                ocf_ltm=ocf_margin,
+                ocf_trend=trends['ocf'],
+                fcf_ltm=fcf_margin,
+                fcf_trend=trends['fcf']
+            ),
+
+            'quality': Quality(
+                net_income_consistency=net_income_consistency,
+                fcf_consistency=fcf_consistency
+            ),
 
             'historical': {
-                'annual': annual_history,
-                'quarterly': quarterly_history
+                'annual': self._annual_history.get(symbol, []),
+                'quarterly': self._quarterly_history.get(symbol, [])
             }
         }
 
@@ -505,69 +554,36 @@ class StockAnalyzer:
         Returns:
             Dict with sector and industry stats
         """
-        sector_data = defaultdict(list)
-        industry_data = defaultdict(list)
-
-        # Group by sector and industry
-        for stock in stocks_analyzed:
-            sector = stock['sector']
-            industry = stock['industry']
-
-            if sector and str(sector).lower() not in ['nan', 'none', '']:
-                sector_data[sector].append(stock)
-            if industry and str(industry).lower() not in ['nan', 'none', '']:
-                industry_data[industry].append(stock)
-
-        # Calculate sector aggregates
-        sector_overview = {}
-        for sector, stocks in sector_data.items():
-            sector_overview[sector] = self._calculate_group_stats(stocks)
-            sector_overview[sector]['stock_count'] = len(stocks)
-
-        # Calculate industry aggregates
-        industry_overview = {}
-        for industry, stocks in industry_data.items():
-            industry_overview[industry] = self._calculate_group_stats(stocks)
-            industry_overview[industry]['stock_count'] = len(stocks)
+        # Flatten the grouping keys and summarized metrics into one frame
+        flat = pd.DataFrame({
+            'sector': [stock['sector'] for stock in stocks_analyzed],
+            'industry': [stock['industry'] for stock in stocks_analyzed],
+        })
+        for name, (section, key) in AGGREGATE_METRICS.items():
+            values = [stock[section] for stock in stocks_analyzed]
+            if section in ('price', 'growth'):
+                values = [value.get(key) for value in values]
+            else:
+                values = [getattr(value, key) for value in values]
+            flat[name] = pd.Series(values, dtype='float64')
 
         return {
-            'sector_overview': sector_overview,
-            'industry_overview': industry_overview
+            'sector_overview': self._calculate_group_stats(flat, 'sector'),
+            'industry_overview': self._calculate_group_stats(flat, 'industry')
         }
 
-    def _calculate_group_stats(self, stocks: List[Dict]) -> Dict[str, float]:
-        """Calculate average and median for a group of stocks."""
+    def _calculate_group_stats(self, flat: pd.DataFrame, group_col: str) -> Dict[str, Dict[str, Any]]:
+        """Calculate average, median and stock count per group in one groupby pass."""
+        keys = flat[group_col]
+        valid = keys.notna() & ~keys.astype(str).str.lower().isin(['nan', 'none', ''])
+        grouped = flat.loc[valid, [group_col, *AGGREGATE_METRICS]].groupby(group_col, sort=False)
 
-        def safe_avg(values):
-            valid = [v for v in values if v is not None and not np.isnan(v)]
-            return round(np.mean(valid), 2) if valid else None
+        stats = grouped.agg(['mean', 'median']).round(2)
+        stats.columns = [f"{name}_{'avg' if stat == 'mean' else stat}" for name, stat in stats.columns]
+        stats = stats.astype(object).where(stats.notna(), None)
+        stats['stock_count'] = grouped.size()
 
-        def safe_median(values):
-            valid = [v for v in values if v is not None and not np.isnan(v)]
-            return round(np.median(valid), 2) if valid else None
-
-        # Extract all metrics
-        pe_values = [s['valuation']['pe_ltm'] for s in stocks]
-        pb_values = [s['valuation']['pb'] for s in stocks]
-        ev_fcf_values = [s['valuation']['ev_fcf'] for s in stocks]
-        revenue_cagr_3y = [s['growth'].get('revenue_cagr_3y') for s in stocks]
-        net_margin_values = [s['margins']['net_ltm'] for s in stocks]
-        volatility_values = [s['price']['volatility'] for s in stocks]
-
-        return {
-            'pe_avg': safe_avg(pe_values),
-            'pe_median': safe_median(pe_values),
-            'pb_avg': safe_avg(pb_values),
-            'pb_median': safe_median(pb_values),
-            'ev_fcf_avg': safe_avg(ev_fcf_values),
-            'ev_fcf_median': safe_median(ev_fcf_values),
-            'revenue_cagr_3y_avg': safe_avg(revenue_cagr_3y),
-            'revenue_cagr_3y_median': safe_median(revenue_cagr_3y),
-            'net_margin_avg': safe_avg(net_margin_values),
-            'net_margin_median': safe_median(net_margin_values),
-            'volatility_avg': safe_avg(volatility_values),
-            'volatility_median': safe_median(volatility_values)
-        }
+        return stats.to_dict(orient='index')
 
     def run_analysis(self) -> Dict[str, Any]:
         """
@@ -582,8 +598,7 @@ class StockAnalyzer:
         success_count = 0
         error_count = 0
 
-        for idx, row in self.stocks_df.iterrows():
-            symbol = row['symbol']
+        for symbol in self.stocks_df['symbol']:
             try:
                 stock_data = self.analyze_stock(symbol)
                 analyzed_stocks.append(stock_data)
@@ -631,12 +646,11 @@ class StockAnalyzer:
         output_file = Path(output_path)
         output_file.parent.mkdir(parents=True, exist_ok=True)
 
-        # Export to JSON
+        # Export to JSON (orjson writes NaN/inf as null and serializes NumPy
+        # scalars natively, so the data needs no cleaning pass)
         print(f"\nExporting to {output_path}...")
-        # Clean data to remove NaN values
-        clean_data = clean_for_json(data)
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(clean_data, f, indent=2, ensure_ascii=False)
+        with open(output_file, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
 
         print(f"[OK] Exported successfully!")
         print(f"  File size: {output_file.stat().st_size / 1024:.1f} KB")
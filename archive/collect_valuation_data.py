@@ -4,15 +4,60 @@ Fetches market cap, debt, cash, and book value for all 403 stocks in database.
 """
 
 import csv
-import time
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import pandas as pd
 from tqdm import tqdm
 from collectors.stock_collector import StockCollector
+from collectors import coalescer
 from database.db_manager import DatabaseManager, Stock
-from utils import setup_logger
+from utils import setup_logger, cached_record, RateLimiter
 
 logger = setup_logger('valuation_collector', level='INFO')
 
+# Concurrent fetches, all sharing one limiter of at most 2 calls per second
+MAX_WORKERS = 6
+MIN_CALL_INTERVAL = 0.5
+
+OUTPUT_PATH = Path('exports/valuation_data.csv')
+FIELDNAMES = ['symbol', 'company_name', 'exchange', 'market_cap',
+              'total_debt', 'total_cash', 'book_value', 'balance_sheet_date', 'status']
+
+
+# Each worker thread reuses one StockCollector across the symbols it handles
+_worker = threading.local()
+
+
+def collect_one(stock, rate_limiter):
+    """
+    Fetch valuation data for one stock.
+
+    Returns:
+        Tuple of (valuation dict, status) where status is complete/partial/failed
+    """
+    collector = getattr(_worker, 'collector', None)
+    if collector is None:
+        collector = _worker.collector = StockCollector(stock['symbol'], rate_limiter=rate_limiter)
+    else:
+        collector.set_symbol(stock['symbol'])
+
+    # Fetch valuation data (served from cache/valuation/ when fresh); concurrent
+    # requests for the same symbol share one upstream call
+    val_data = cached_record('valuation', stock['symbol'],
+                             lambda: coalescer.fetch_valuation_data(collector))
+
+    # Check if we got data
+    if val_data.get('market_cap'):
+        status = "complete"
+    elif any(v for k, v in val_data.items() if k != 'market_cap' and v):
+        status = "partial"
+    else:
+        status = "failed"
+
+    return val_data, status
+
 
 def collect_valuation_data():
     """Collect valuation data for all stocks in database."""
@@ -31,91 +76,81 @@ def collect_valuation_data():
         } for s in stocks]
         print(f"\nFound {len(stock_list)} stocks in database")
 
-    # Prepare output data
-    valuation_records = []
-
     # Collect data with progress bar
     print("\n" + "="*70)
     print("COLLECTING VALUATION DATA")
     print("="*70 + "\n")
 
-    success_count = 0
-    partial_count = 0
-    fail_count = 0
-
-    with tqdm(total=len(stock_list), desc="Collecting", unit="stock") as pbar:
-        for stock in stock_list:
-            pbar.set_description(f"Collecting {stock['symbol']}")
-
-            try:
-                # Create collector
-                collector = StockCollector(stock['symbol'], rate_limit_delay=0.5)
-
-                # Fetch valuation data
-                val_data = collector.fetch_valuation_data()
-
-                # Check if we got data
-                if val_data.get('market_cap'):
-                    success_count += 1
-                    status = "complete"
-                elif any(v for k, v in val_data.items() if k != 'market_cap' and v):
-                    partial_count += 1
-                    status = "partial"
-                else:
-                    fail_count += 1
-                    status = "failed"
-
-                # Add to records
-                valuation_records.append({
-                    'symbol': stock['symbol'],
-                    'company_name': stock['company_name'],
-                    'exchange': stock['exchange'],
-                    'market_cap': val_data.get('market_cap'),
-                    'total_debt': val_data.get('total_debt', 0),
-                    'total_cash': val_data.get('total_cash', 0),
-                    'book_value': val_data.get('book_value'),
-                    'balance_sheet_date': val_data.get('balance_sheet_date'),
-                    'status': status
-                })
-
-            except Exception as e:
-                logger.error(f"Error collecting {stock['symbol']}: {e}")
-                fail_count += 1
-                valuation_records.append({
-                    'symbol': stock['symbol'],
-                    'company_name': stock['company_name'],
-                    'exchange': stock['exchange'],
-                    'market_cap': None,
-                    'total_debt': 0,
-                    'total_cash': 0,
-                    'book_value': None,
-                    'balance_sheet_date': None,
-                    'status': 'error'
-                })
-
-            pbar.update(1)
-            time.sleep(0.2)  # Brief delay
-
-    # Save to CSV
-    output_path = Path('exports/valuation_data.csv')
-    output_path.parent.mkdir(exist_ok=True)
-
-    with open(output_path, 'w', newline='', encoding='utf-8') as f:
-        fieldnames = ['symbol', 'company_name', 'exchange', 'market_cap',
-                     'total_debt', 'total_cash', 'book_value', 'balance_sheet_date', 'status']
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(valuation_records)
+    # Written rows, kept for the Parquet copy; the summary counts come from
+    # their status column
+    rows = []
+
+    # Rows are streamed to the CSV as they are collected, so an interrupted
+    # run keeps everything fetched so far
+    OUTPUT_PATH.parent.mkdir(exist_ok=True)
+
+    with open(OUTPUT_PATH, 'w', newline='', encoding='utf-8') as output_file, \
+            tqdm(total=len(stock_list), desc="Collecting", unit="stock",
+                 mininterval=0.5, miniters=10) as pbar:
+        writer = csv.writer(output_file)
+        writer.writerow(FIELDNAMES)
+
+        # Fetches are I/O-bound, so a small pool overlaps their latency while
+        # the shared limiter keeps the overall request rate down
+        rate_limiter = RateLimiter(MIN_CALL_INTERVAL)
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            futures = [executor.submit(collect_one, stock, rate_limiter) for stock in stock_list]
+
+            # Write rows in submission (database) order so the CSV is
+            # deterministic; later stocks keep fetching while we wait
+            for stock, future in zip(stock_list, futures):
+                # Cache hits finish instantly, so only relabel every 10 stocks
+                # and let tqdm's own redraw throttling show it
+                if pbar.n % 10 == 0:
+                    pbar.set_description(f"Collecting {stock['symbol']}", refresh=False)
+
+                try:
+                    val_data, status = future.result()
+
+                    row = (
+                        stock['symbol'],
+                        stock['company_name'],
+                        stock['exchange'],
+                        val_data.get('market_cap'),
+                        val_data.get('total_debt', 0),
+                        val_data.get('total_cash', 0),
+                        val_data.get('book_value'),
+                        val_data.get('balance_sheet_date'),
+                        status
+                    )
+
+                except Exception as e:
+                    logger.error(f"Error collecting {stock['symbol']}: {e}")
+                    row = (stock['symbol'], stock['company_name'], stock['exchange'],
+                           None, 0, 0, None, None, 'error')
+
+                # Write row
+                writer.writerow(row)
+                rows.append(row)
+                pbar.update(1)
+                if pbar.n % 20 == 0:
+                    output_file.flush()
+
+    # Write the Parquet copy downstream pipelines read (valuation_data.parquet);
+    # it is newer than the CSV, so the analysis engine loads it directly
+    pd.DataFrame(rows, columns=FIELDNAMES).to_parquet(
+        OUTPUT_PATH.with_suffix('.parquet'), index=False, compression='zstd')
 
     # Print summary
+    status_counts = Counter(row[-1] for row in rows)
     print("\n" + "="*70)
     print("COLLECTION SUMMARY")
     print("="*70)
     print(f"Total stocks:        {len(stock_list)}")
-    print(f"Complete data:       {success_count}")
-    print(f"Partial data:        {partial_count}")
-    print(f"Failed:              {fail_count}")
-    print(f"\nOutput: {output_path}")
+    print(f"Complete data:       {status_counts['complete']}")
+    print(f"Partial data:        {status_counts['partial']}")
+    print(f"Failed:              {status_counts['failed'] + status_counts['error']}")
+    print(f"\nOutput: {OUTPUT_PATH} (+ {OUTPUT_PATH.with_suffix('.parquet').name})")
     print("="*70 + "\n")
 
 
@@ -4,6 +4,63 @@ Test how yfinance calculates Free Cash Flow.
 
 import yfinance as yf
 import pandas as pd
+from utils import cached_frame
+
+# Cash flow fields shown for the most recent period
+FIELDS_TO_CHECK = [
+    'Operating Cash Flow',
+    'Capital Expenditure',
+    'Free Cash Flow',
+    'Issuance Of Capital Stock',
+    'Issuance Of Debt',
+    'Repayment Of Debt',
+    'Repurchase Of Capital Stock'
+]
+
+
+def check_statement(cf, period_name):
+    """Print key fields for the latest period and compare OCF + CapEx with FCF for every period."""
+    if len(cf.columns) == 0:
+        return
+
+    recent = cf.columns[0]
+    print(f"\n\nMost Recent {period_name}: {recent}")
+    print("-" * 70)
+
+    # One reindex gives every field across all periods (NaN rows for missing fields)
+    sub = cf.reindex(FIELDS_TO_CHECK)
+    found = sub.index.isin(cf.index)
+
+    for field, value, is_found in zip(FIELDS_TO_CHECK, sub[recent], found):
+        if not is_found:
+            print(f"{field:40s}: {'NOT FOUND':>20}")
+        elif pd.notna(value):
+            print(f"{field:40s}: {value:>20,.0f}")
+        else:
+            print(f"{field:40s}: {'N/A':>20}")
+
+    # Manual calculation for all periods at once (CapEx is usually negative)
+    manual_fcf = sub.loc['Operating Cash Flow'] + sub.loc['Capital Expenditure']
+    yf_fcf = sub.loc['Free Cash Flow']
+    diffs = manual_fcf - yf_fcf
+
+    if pd.notna(manual_fcf[recent]):
+        print(f"\n{'Manual FCF Calculation:':40s}")
+        print(f"{'OCF + CapEx':40s}: {manual_fcf[recent]:>20,.0f}")
+
+        if pd.notna(yf_fcf[recent]):
+            print(f"{'yfinance FCF':40s}: {yf_fcf[recent]:>20,.0f}")
+            print(f"{'Difference':40s}: {diffs[recent]:>20,.0f}")
+
+            if abs(diffs[recent]) < 1000:  # Within 1000 rounding error
+                print("\n✅ Manual calculation matches yfinance!")
+            else:
+                print("\n⚠️ Discrepancy found!")
+
+    if diffs.notna().any():
+        print(f"\nDifference by {period_name.lower()} (OCF + CapEx - FCF):")
+        print(diffs.dropna().to_string())
+
 
 def test_fcf_calculation(symbol):
     """Test FCF calculation for a given symbol."""
@@ -13,102 +70,20 @@ def test_fcf_calculation(symbol):
 
     ticker = yf.Ticker(symbol)
 
-    # Get quarterly cash flow
-    quarterly_cf = ticker.quarterly_cashflow
+    # Get quarterly cash flow (cached transposed: Parquet needs string column names)
+    quarterly_cf = cached_frame('fcf', f'{symbol}_qcf', lambda: ticker.quarterly_cashflow.T).T
 
     print("\n--- QUARTERLY CASH FLOW STATEMENT ---")
     print("\nAvailable fields:")
     print(quarterly_cf.index.tolist())
 
-    # Get the most recent quarter
-    if len(quarterly_cf.columns) > 0:
-        recent_quarter = quarterly_cf.columns[0]
-        print(f"\n\nMost Recent Quarter: {recent_quarter}")
-        print("-" * 70)
-
-        # Look for key fields
-        fields_to_check = [
-            'Operating Cash Flow',
-            'Capital Expenditure',
-            'Free Cash Flow',
-            'Issuance Of Capital Stock',
-            'Issuance Of Debt',
-            'Repayment Of Debt',
-            'Repurchase Of Capital Stock'
-        ]
-
-        for field in fields_to_check:
-            if field in quarterly_cf.index:
-                value = quarterly_cf.loc[field, recent_quarter]
-                if pd.notna(value):
-                    print(f"{field:40s}: {value:>20,.0f}")
-                else:
-                    print(f"{field:40s}: {'N/A':>20}")
-            else:
-                print(f"{field:40s}: {'NOT FOUND':>20}")
-
-        # Manual calculation
-        if 'Operating Cash Flow' in quarterly_cf.index and 'Capital Expenditure' in quarterly_cf.index:
-            ocf = quarterly_cf.loc['Operating Cash Flow', recent_quarter]
-            capex = quarterly_cf.loc['Capital Expenditure', recent_quarter]
-
-            if pd.notna(ocf) and pd.notna(capex):
-                manual_fcf = ocf + capex  # CapEx is usually negative
-                print(f"\n{'Manual FCF Calculation:':40s}")
-                print(f"{'OCF + CapEx':40s}: {manual_fcf:>20,.0f}")
-
-                if 'Free Cash Flow' in quarterly_cf.index:
-                    yf_fcf = quarterly_cf.loc['Free Cash Flow', recent_quarter]
-                    if pd.notna(yf_fcf):
-                        print(f"{'yfinance FCF':40s}: {yf_fcf:>20,.0f}")
-                        diff = manual_fcf - yf_fcf
-                        print(f"{'Difference':40s}: {diff:>20,.0f}")
-
-                        if abs(diff) < 1000:  # Within 1000 rounding error
-                            print("\n✅ Manual calculation matches yfinance!")
-                        else:
-                            print("\n⚠️ Discrepancy found!")
+    check_statement(quarterly_cf, 'Quarter')
 
     # Test annual cash flow too
     print("\n\n--- ANNUAL CASH FLOW STATEMENT ---")
-    annual_cf = ticker.cashflow
-
-    if len(annual_cf.columns) > 0:
-        recent_year = annual_cf.columns[0]
-        print(f"\n\nMost Recent Year: {recent_year}")
-        print("-" * 70)
-
-        for field in fields_to_check:
-            if field in annual_cf.index:
-                value = annual_cf.loc[field, recent_year]
-                if pd.notna(value):
-                    print(f"{field:40s}: {value:>20,.0f}")
-                else:
-                    print(f"{field:40s}: {'N/A':>20}")
-            else:
-                print(f"{field:40s}: {'NOT FOUND':>20}")
-
-        # Manual calculation for annual
-        if 'Operating Cash Flow' in annual_cf.index and 'Capital Expenditure' in annual_cf.index:
-            ocf = annual_cf.loc['Operating Cash Flow', recent_year]
-            capex = annual_cf.loc['Capital Expenditure', recent_year]
-
-            if pd.notna(ocf) and pd.notna(capex):
-                manual_fcf = ocf + capex  # CapEx is usually negative
-                print(f"\n{'Manual FCF Calculation:':40s}")
-                print(f"{'OCF + CapEx':40s}: {manual_fcf:>20,.0f}")
-
-                if 'Free Cash Flow' in annual_cf.index:
-                    yf_fcf = annual_cf.loc['Free Cash Flow', recent_year]
-                    if pd.notna(yf_fcf):
-                        print(f"{'yfinance FCF':40s}: {yf_fcf:>20,.0f}")
-                        diff = manual_fcf - yf_fcf
-                        print(f"{'Difference':40s}: {diff:>20,.0f}")
-
-                        if abs(diff) < 1000:
-                            print("\n✅ Manual calculation matches yfinance!")
-                        else:
-                            print("\n⚠️ Discrepancy found!")
+    annual_cf = cached_frame('fcf', f'{symbol}_acf', lambda: ticker.cashflow.T).T
+
+    check_statement(annual_cf, 'Year')
 
 
 if __name__ == '__main__':
@@ -3,20 +3,46 @@ Argaam Stock Symbol Scraper for Tadawul Hawk.
 Scrapes Argaam.com to get complete list of Tadawul stock symbols.
 """
 
+import logging
+import re
 import sys
+from operator import itemgetter
 from pathlib import Path
 
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent))
 
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+import lxml.html
+from lxml import etree
 import pandas as pd
-from typing import Dict, List
+from typing import Dict, List, Optional
 from utils import get_logger, validate_symbol
 
 logger = get_logger(__name__)
 
+# XPath expressions evaluated per table/row, compiled once
+_TABLE_ROWS = etree.XPath('.//tr')
+_TABLE_HEADERS = etree.XPath('.//th')
+
+# Tables with a header cell containing 'symbol' (case-insensitive), e.g. 'St.Symbol'
+_SYMBOL_TABLES = etree.XPath("//table[.//th[contains(translate(., 'SYMBOL', 'symbol'), 'symbol')]]")
+_ROW_CELLS = etree.XPath('.//td|.//th')
+
+# Symbol cell: a single 4-digit code, optionally surrounded by non-digits
+_SYMBOL_RE = re.compile(r'\D*(\d{4})\D*')
+
+
+def _format_symbol_lines(symbols_data: List[Dict], default_exchange: str) -> str:
+    """Format symbol records as sorted 'SYMBOL|COMPANY_NAME|EXCHANGE' lines, ready for one write."""
+    return ''.join(
+        f"{data['symbol']}|{data.get('company_name', 'N/A')}|{data.get('exchange', default_exchange)}\n"
+        for data in sorted(symbols_data, key=itemgetter('symbol'))
+    )
+
 
 class ArgaamScraper:
     """
@@ -28,12 +54,14 @@ class ArgaamScraper:
     - NOMU: https://www.argaam.com/en/company/companies-prices/14
     """
 
-    def __init__(self, market: str = 'tadawul'):
+    def __init__(self, market: str = 'tadawul', session: Optional[requests.Session] = None):
         """
         Initialize the scraper.
 
         Args:
             market: 'tadawul' for main market or 'nomu' for parallel market
+            session: Session to share with other scrapers (see create_session);
+                     a new one is created if not given
         """
         self.market = market.lower()
         if self.market == 'tadawul':
@@ -46,15 +74,31 @@ class ArgaamScraper:
             raise ValueError("Market must be 'tadawul' or 'nomu'")
 
         self.symbols_data: List[Dict] = []
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.session = session or self.create_session()
+        logger.info(f"ArgaamScraper initialized for {self.market.upper()} market")
+
+    @staticmethod
+    def create_session() -> requests.Session:
+        """
+        Create a session with browser headers for argaam.com.
+
+        Scrapers sharing one session reuse its pooled keep-alive connections
+        (and TLS session) to the host.
+
+        Returns:
+            Configured requests.Session
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+        session.mount('https://', adapter)
+        session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
             'Accept-Language': 'en-US,en;q=0.9,ar;q=0.8',
             'Accept-Encoding': 'gzip, deflate, br',
             'Connection': 'keep-alive'
         })
-        logger.info(f"ArgaamScraper initialized for {self.market.upper()} market")
+        return session
 
     def scrape_all_symbols(self) -> List[Dict]:
         """
@@ -71,15 +115,18 @@ class ArgaamScraper:
             response.raise_for_status()
             logger.info(f"Successfully fetched page (status: {response.status_code})")
 
-            soup = BeautifulSoup(response.content, 'lxml')
+            # Parse with lxml directly; its C-level tree walk and text
+            # extraction avoid building a BeautifulSoup wrapper per node
+            tree = lxml.html.fromstring(response.content)
 
             # Log page title
-            if soup.title:
-                logger.info(f"Page title: {soup.title.string}")
+            title = tree.findtext('.//title')
+            if title:
+                logger.info(f"Page title: {title}")
 
             # Find the table with stock data
             # Argaam typically uses tables for this data
-            tables = soup.find_all('table')
+            tables = tree.xpath('//table')
             logger.info(f"Found {len(tables)} tables on page")
 
             if not tables:
@@ -87,35 +134,32 @@ class ArgaamScraper:
                 return []
 
             # Process ALL tables that have symbol columns
-            # Don't just process one table - there might be multiple tables with different stocks
+            # Don't just process one table - there might be multiple tables with different stocks.
+            # The XPath predicate picks them out in C, so no other table's text is extracted
             target_tables = []
-            for table in tables:
-                # Check if this table has the St.Symbol column
-                headers = table.find_all('th')
-                header_texts = [th.get_text().strip() for th in headers]
-
-                logger.debug(f"Table headers: {header_texts}")
-
-                if any('symbol' in h.lower() for h in header_texts):
-                    target_tables.append(table)
-                    logger.info(f"Found target table with headers: {header_texts}")
+            for table in _SYMBOL_TABLES(tree):
+                header_texts = [th.text_content().strip() for th in _TABLE_HEADERS(table)]
+                target_tables.append(_TABLE_ROWS(table))
+                logger.info(f"Found target table with headers: {header_texts}")
 
             if not target_tables:
                 # If no table with explicit headers, try the largest table
-                target_tables = [max(tables, key=lambda t: len(t.find_all('tr')))]
-                logger.info(f"Using largest table with {len(target_tables[0].find_all('tr'))} rows")
+                target_tables = [max((_TABLE_ROWS(table) for table in tables), key=len)]
+                logger.info(f"Using largest table with {len(target_tables[0])} rows")
 
             logger.info(f"Processing {len(target_tables)} tables")
 
+            # Checked once so non-debug runs skip formatting the per-row message
+            debug_enabled = logger.isEnabledFor(logging.DEBUG)
+
             # Extract data from each table
-            for table_idx, target_table in enumerate(target_tables):
-                rows = target_table.find_all('tr')
+            for table_idx, rows in enumerate(target_tables):
                 logger.info(f"Table {table_idx + 1}: Processing {len(rows)} rows")
 
                 # Get headers
                 header_row = rows[0] if rows else None
-                if header_row:
-                    headers = [th.get_text().strip() for th in header_row.find_all(['th', 'td'])]
+                if header_row is not None:
+                    headers = [th.text_content().strip() for th in _ROW_CELLS(header_row)]
                     logger.info(f"Column headers: {headers}")
 
                     # Find column indices
@@ -136,7 +180,7 @@ class ArgaamScraper:
 
                     # Process data rows
                     for row in rows[1:]:  # Skip header row
-                        cells = row.find_all(['td', 'th'])
+                        cells = _ROW_CELLS(row)
 
                         if len(cells) == 0:
                             continue
@@ -144,21 +188,19 @@ class ArgaamScraper:
                         # Extract symbol
                         symbol = None
                         if symbol_col_idx is not None and symbol_col_idx < len(cells):
-                            symbol_text = cells[symbol_col_idx].get_text().strip()
-                            # Clean symbol (remove any whitespace, special chars)
-                            symbol_clean = ''.join(filter(str.isdigit, symbol_text))
-                            if symbol_clean and len(symbol_clean) == 4:
-                                symbol = f"{symbol_clean}.SR"
+                            match = _SYMBOL_RE.fullmatch(cells[symbol_col_idx].text_content())
+                            if match:
+                                symbol = f"{match.group(1)}.SR"
 
                         # Extract company name
                         company_name = None
                         if name_col_idx is not None and name_col_idx < len(cells):
-                            company_name = cells[name_col_idx].get_text().strip()
+                            company_name = cells[name_col_idx].text_content().strip()
 
                         # Extract exchange
                         exchange = self.default_exchange  # Default to market being scraped
                         if exchange_col_idx is not None and exchange_col_idx < len(cells):
-                            exchange_text = cells[exchange_col_idx].get_text().strip()
+                            exchange_text = cells[exchange_col_idx].text_content().strip()
                             if 'nomu' in exchange_text.lower():
                                 exchange = 'NOMU'
                             elif 'tadawul' in exchange_text.lower():
@@ -171,7 +213,8 @@ class ArgaamScraper:
                                 'company_name': company_name,
                                 'exchange': exchange
                             })
-                            logger.debug(f"Found: {symbol} - {company_name} ({exchange})")
+                            if debug_enabled:
+                                logger.debug(f"Found: {symbol} - {company_name} ({exchange})")
 
             logger.info(f"Scraping complete. Found {len(self.symbols_data)} symbols")
 
@@ -199,10 +242,7 @@ class ArgaamScraper:
                 f.write(f"# Format: SYMBOL | COMPANY_NAME | EXCHANGE\n")
                 f.write("#\n")
 
-                for data in sorted(self.symbols_data, key=lambda x: x['symbol']):
-                    company_name = data.get('company_name', 'N/A')
-                    exchange = data.get('exchange', 'Tadawul')
-                    f.write(f"{data['symbol']}|{company_name}|{exchange}\n")
+                f.write(_format_symbol_lines(self.symbols_data, default_exchange='Tadawul'))
 
             logger.info(f"Symbols saved to {filepath}")
             logger.info(f"Total symbols saved: {len(self.symbols_data)}")
@@ -237,37 +277,29 @@ def main():
 
     all_symbols_data = []
 
-    # Scrape Tadawul (main market)
-    print("TADAWUL MAIN MARKET")
-    print("-" * 60)
-    print("Source: https://www.argaam.com/en/company/companies-prices/3")
-    try:
-        tadawul_scraper = ArgaamScraper(market='tadawul')
-        tadawul_symbols = tadawul_scraper.scrape_all_symbols()
-        all_symbols_data.extend(tadawul_symbols)
-        print(f"[OK] Tadawul: {len(tadawul_symbols)} symbols scraped")
-    except Exception as e:
-        print(f"X Tadawul scraping failed: {e}")
-        logger.error(f"Tadawul scraping failed: {e}", exc_info=True)
-        return 1
-
-    print()
+    # The two markets are independent page fetches, so scrape them concurrently
+    markets = [('tadawul', 'TADAWUL MAIN MARKET', 'Tadawul'),
+               ('nomu', 'NOMU PARALLEL MARKET', 'NOMU')]
+    session = ArgaamScraper.create_session()
+    scrapers = [ArgaamScraper(market=market, session=session) for market, _, _ in markets]
+    with ThreadPoolExecutor(max_workers=len(scrapers)) as executor:
+        futures = [executor.submit(scraper.scrape_all_symbols) for scraper in scrapers]
+
+    for scraper, future, (_, title, label) in zip(scrapers, futures, markets):
+        print(title)
+        print("-" * 60)
+        print(f"Source: {scraper.url}")
+        try:
+            symbols = future.result()
+            all_symbols_data.extend(symbols)
+            print(f"[OK] {label}: {len(symbols)} symbols scraped")
+        except Exception as e:
+            print(f"X {label} scraping failed: {e}")
+            logger.error(f"{label} scraping failed: {e}", exc_info=True)
+            return 1
 
-    # Scrape NOMU (parallel market)
-    print("NOMU PARALLEL MARKET")
-    print("-" * 60)
-    print("Source: https://www.argaam.com/en/company/companies-prices/14")
-    try:
-        nomu_scraper = ArgaamScraper(market='nomu')
-        nomu_symbols = nomu_scraper.scrape_all_symbols()
-        all_symbols_data.extend(nomu_symbols)
-        print(f"[OK] NOMU: {len(nomu_symbols)} symbols scraped")
-    except Exception as e:
-        print(f"X NOMU scraping failed: {e}")
-        logger.error(f"NOMU scraping failed: {e}", exc_info=True)
-        return 1
+        print()
 
-    print()
     print("="*60)
     print("COMBINED RESULTS")
     print("="*60)
@@ -307,10 +339,7 @@ def main():
             f.write(f"# Format: SYMBOL | COMPANY_NAME | EXCHANGE\n")
             f.write("#\n")
 
-            for data in sorted(all_symbols_data, key=lambda x: x['symbol']):
-                company_name = data.get('company_name', 'N/A')
-                exchange = data.get('exchange', 'Unknown')
-                f.write(f"{data['symbol']}|{company_name}|{exchange}\n")
+            f.write(_format_symbol_lines(all_symbols_data, default_exchange='Unknown'))
 
         print(f"\n[OK] Combined symbols saved to: {output_file}")
 
@@ -330,6 +359,6 @@ if __name__ == '__main__':
     from utils import setup_logger
 
     # Setup logging
-    setup_logger('argaam_scraper', level='DEBUG')
+    setup_logger('argaam_scraper', level='INFO')
 
     sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,56 @@
+"""
+In-flight request coalescing for Tadawul Hawk collectors.
+Concurrent requests for the same key share one upstream call.
+"""
+
+import threading
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable
+
+if TYPE_CHECKING:  # stock_collector itself coalesces through this module
+    from .stock_collector import StockCollector
+
+_inflight: Dict[Hashable, Future] = {}
+_lock = threading.Lock()
+
+
+def coalesce(key: Hashable, fetch: Callable[[], Any]) -> Any:
+    """
+    Run fetch(), or wait for an identical call that is already in flight.
+
+    The first caller for a key performs the fetch; callers arriving while it
+    runs block on the same Future and get its result (or exception). The key
+    is released once the fetch finishes, so later calls fetch again.
+
+    Args:
+        key: Identifies identical requests (e.g. ('valuation', '2222.SR'))
+        fetch: Performs the upstream call
+
+    Returns:
+        Result of the shared fetch
+    """
+    with _lock:
+        future = _inflight.get(key)
+        is_owner = future is None
+        if is_owner:
+            future = Future()
+            _inflight[key] = future
+
+    if not is_owner:
+        return future.result()
+
+    try:
+        result = fetch()
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _lock:
+            _inflight.pop(key, None)
+
+
+def fetch_valuation_data(collector: 'StockCollector') -> Dict[str, Any]:
+    """Coalesced StockCollector.fetch_valuation_data, keyed by symbol."""
+    return coalesce(('valuation', collector.symbol), collector.fetch_valuation_data)
@@ -3,15 +3,219 @@ Stock Data Collector for Tadawul Hawk.
 Fetches price data and fundamentals using yfinance.
 """
 
+import asyncio
+import logging
+import threading
 import yfinance as yf
+from yfinance.data import YfData
+try:
+    from yfinance.data import new_session
+except ImportError:  # older yfinance: let it manage its own session
+    new_session = None
+import random
 import time
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Tuple
+import numpy as np
 import pandas as pd
-from utils import get_logger
+from utils import get_logger, RateLimiter, cached_object
+from .coalescer import coalesce
 
 logger = get_logger(__name__)
 
+try:
+    from yfinance.exceptions import YFRateLimitError
+    RATE_LIMIT_ERRORS = (YFRateLimitError,)
+except ImportError:  # yfinance < 0.2.52 has no dedicated rate limit error
+    RATE_LIMIT_ERRORS = ()
+
+# HTTP session shared by every Ticker and the raw timeseries request, so all
+# collectors reuse one connection pool to Yahoo (see get_session)
+_SESSION = None
+_session_lock = threading.Lock()
+
+# Stocks collected at once by collect_many
+CONCURRENCY_LIMIT = 8
+
+# Daily price history downloaded once per symbol; covers every price lookback
+HISTORY_PERIOD = '5y'
+
+# Yahoo fundamentals timeseries endpoint (the source of the ticker statement properties)
+FUNDAMENTALS_TIMESERIES_URL = 'https://query2.finance.yahoo.com/ws/fundamentals-timeseries/v1/finance/timeseries/{symbol}'
+
+# collect_all_data results kept in the on-disk cache (utils.cache) between
+# runs; these do not change within a trading day, unlike the current price
+CACHED_TASKS = ('stock_info', 'historical_prices', 'quarterly_fundamentals', 'annual_fundamentals')
+
+# Price lookbacks, in nanoseconds to match the history index's asi8: months are
+# rounded to 30 calendar days, and a target date is matched to the closest
+# trading day at most 7 days away
+_MONTH_NS = pd.Timedelta(days=30).value
+_PRICE_DATE_TOLERANCE_NS = pd.Timedelta(days=7).value
+
+# calculate_high_low periods and how far back each starts, in nanoseconds
+_HIGH_LOW_PERIODS = ('week_52', 'year_3', 'year_5')
+_HIGH_LOW_SPANS_NS = np.array([pd.Timedelta(days=365 * years).value for years in (1, 3, 5)])
+
+# Backoff after a rate limit (429) error grows from a larger base than other errors
+RATE_LIMIT_BACKOFF_BASE = 5
+
+# Calls a collector's rate limiter lets through back to back (one per
+# collect_all_data task) before spacing them rate_limit_delay apart
+RATE_LIMIT_BURST = 7
+
+
+# Statement rows extracted for each fundamentals period: output key -> row label
+INCOME_FIELDS = {
+    'revenue': 'Total Revenue',
+    'gross_profit': 'Gross Profit',
+    'net_income': 'Net Income',
+}
+CASHFLOW_FIELDS = {
+    'operating_cash_flow': 'Operating Cash Flow',
+    'capital_expenditure': 'Capital Expenditure',
+    'free_cash_flow': 'Free Cash Flow',
+}
+
+
+# Column layout of the fundamentals frames, after the period columns
+FUNDAMENTALS_FIELDS = (*INCOME_FIELDS, *CASHFLOW_FIELDS)
+
+# Timeseries types requested together by _get_fundamentals_timeseries: every
+# fundamentals row at both frequencies (Yahoo's key is the label without
+# spaces) plus the balance sheet equity used for valuation
+TIMESERIES_TYPES = tuple(
+    f"{frequency}{label.replace(' ', '')}"
+    for frequency in ('quarterly', 'annual')
+    for label in (*INCOME_FIELDS.values(), *CASHFLOW_FIELDS.values())
+) + ('annualStockholdersEquity',)
+
+
+def _fill_fields(frame: pd.DataFrame, statement: pd.DataFrame, fields: Dict[str, str],
+                 positions: np.ndarray):
+    """Copy the fields whose rows the statement has into frame's rows at positions."""
+    present = {key: label for key, label in fields.items() if label in statement.index}
+    if present and len(positions):
+        values = statement.loc[list(present.values()), frame.index[positions]].T
+        frame.iloc[positions, frame.columns.get_indexer(list(present))] = values.to_numpy(dtype=float)
+
+
+def _timeseries_statement(series: Dict[str, List[Dict[str, Any]]], frequency: str,
+                          fields: Dict[str, str]) -> pd.DataFrame:
+    """
+    Rebuild a statement from timeseries points, laid out like ticker.quarterly_financials.
+
+    Args:
+        series: Reported points per timeseries type (see _get_fundamentals_timeseries)
+        frequency: 'quarterly' or 'annual'
+        fields: Output key -> row label, e.g. INCOME_FIELDS
+
+    Returns:
+        DataFrame with one row per reported label and period dates as columns,
+        newest first; empty if none of the rows were reported
+    """
+    rows = {}
+    for label in fields.values():
+        points = series.get(f"{frequency}{label.replace(' ', '')}")
+        if points:
+            rows[label] = {pd.Timestamp(point['asOfDate']): point['reportedValue']['raw'] for point in points}
+
+    statement = pd.DataFrame.from_dict(rows, orient='index', dtype=float)
+    return statement[sorted(statement.columns, reverse=True)]
+
+
+def _statement_frame(income: pd.DataFrame, cashflow: Optional[pd.DataFrame],
+                     cutoff) -> pd.DataFrame:
+    """
+    Extract the fundamentals fields for every period on or after cutoff.
+
+    Args:
+        income: Income statement (rows = line items, columns = period dates)
+        cashflow: Cash flow statement for the same frequency (may be None/empty)
+        cutoff: Oldest period date to include
+
+    Returns:
+        float64 DataFrame indexed by period date in the income statement's
+        column order, with one column per FUNDAMENTALS_FIELDS entry; NaN where
+        a statement lacks the row or the cash flow statement lacks the period
+    """
+    periods = income.columns[income.columns >= cutoff]
+    frame = pd.DataFrame(np.nan, index=periods, columns=list(FUNDAMENTALS_FIELDS))
+
+    _fill_fields(frame, income, INCOME_FIELDS, np.arange(len(periods)))
+    if cashflow is not None and not cashflow.empty:
+        _fill_fields(frame, cashflow, CASHFLOW_FIELDS, np.flatnonzero(periods.isin(cashflow.columns)))
+
+    return frame
+
+
+def _fundamentals_frame(symbol: str, fields: pd.DataFrame, quarterly: bool) -> pd.DataFrame:
+    """Prefix a _statement_frame result with the symbol and fiscal period columns."""
+    dates = pd.DatetimeIndex(fields.index)
+    columns = {'symbol': symbol, 'fiscal_year': dates.year.astype('int16')}
+    if quarterly:
+        columns['fiscal_quarter'] = dates.quarter.astype('int8')
+        columns['quarter_end_date'] = dates
+    else:
+        columns['year_end_date'] = dates
+
+    return pd.concat([pd.DataFrame(columns, index=fields.index), fields], axis=1).reset_index(drop=True)
+
+
+def fundamentals_records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Convert a fundamentals frame to the list-of-dicts form stored and validated downstream.
+
+    Args:
+        frame: Result of fetch_quarterly_fundamentals_frame or fetch_annual_fundamentals_frame
+
+    Returns:
+        One dict per period, with NaN as None and period end dates as datetime.date
+    """
+    dates = {col: frame[col].dt.date for col in ('quarter_end_date', 'year_end_date') if col in frame}
+    records = frame.assign(**dates).astype(object)
+    return records.where(frame.notna(), None).to_dict(orient='records')
+
+
+def get_session():
+    """
+    Get the HTTP session shared by all collectors, creating it on first use.
+
+    yfinance picks the backend (a browser-impersonating curl_cffi session
+    when available). Returns None on yfinance versions without new_session,
+    which then fall back to their own internal session.
+    """
+    global _SESSION
+    with _session_lock:
+        if _SESSION is None and new_session is not None:
+            _SESSION = new_session()
+        return _SESSION
+
+
+def close_session():
+    """Close the shared HTTP session; the next fetch opens a new one."""
+    global _SESSION
+    with _session_lock:
+        if _SESSION is not None:
+            _SESSION.close()
+            _SESSION = None
+        # Cached Tickers hold the closed session
+        _cached_ticker.cache_clear()
+
+
+@lru_cache(maxsize=2048)
+def _cached_ticker(symbol: str) -> yf.Ticker:
+    """
+    Get the yfinance Ticker for a symbol, shared by every collector in the process.
+
+    Collecting a symbol again (or from several collectors) reuses the Ticker
+    and whatever yfinance has already loaded into it, instead of building a
+    fresh one. Cleared by close_session().
+    """
+    return yf.Ticker(symbol, session=get_session())
+
 
 class StockCollector:
     """
@@ -25,32 +229,58 @@ class StockCollector:
     - Rate limiting and retry logic
     """
 
-    def __init__(self, symbol: str, rate_limit_delay: float = 0.5):
+    def __init__(self, symbol: str, rate_limit_delay: float = 0.5,
+                 rate_limiter: Optional[RateLimiter] = None):
         """
         Initialize the stock collector.
 
         Args:
             symbol: Stock symbol (e.g., '2222.SR')
-            rate_limit_delay: Delay between API calls in seconds (default 0.5s)
+            rate_limit_delay: Seconds per API call at the sustained rate (default 0.5s);
+                              up to RATE_LIMIT_BURST calls may go back to back
+            rate_limiter: Limiter shared with other collectors; replaces the
+                          per-instance rate_limit_delay when given
         """
         self.symbol = symbol
         self.rate_limit_delay = rate_limit_delay
         self.ticker = None
-        self.last_request_time = 0
+        # The fetches may run concurrently (collect_all_data_async), so even a
+        # collector's own limit goes through the thread-safe limiter
+        self.rate_limiter = rate_limiter or RateLimiter(rate_limit_delay, burst=RATE_LIMIT_BURST)
+        self._history = None
+        self._history_lock = threading.Lock()
+        self._info = None
+        self._info_lock = threading.Lock()
+        self._timeseries = None
+        self._timeseries_lock = threading.Lock()
+
+        logger.debug("StockCollector initialized for %s", symbol)
+
+    def set_symbol(self, symbol: str):
+        """
+        Point this collector at another symbol so one instance can be reused.
 
-        logger.info(f"StockCollector initialized for {symbol}")
+        Args:
+            symbol: Stock symbol (e.g., '2222.SR')
+        """
+        self.symbol = symbol
+        self.ticker = None
+        self._history = None
+        self._info = None
+        self._timeseries = None
 
     def _rate_limit(self):
         """Apply rate limiting between API calls."""
-        elapsed = time.time() - self.last_request_time
-        if elapsed < self.rate_limit_delay:
-            sleep_time = self.rate_limit_delay - elapsed
-            time.sleep(sleep_time)
-        self.last_request_time = time.time()
+        self.rate_limiter.wait()
 
     def _retry_with_backoff(self, func, max_attempts: int = 4, *args, **kwargs):
         """
-        Execute a function with exponential backoff retry logic.
+        Execute a function with jittered exponential backoff retry logic.
+
+        Waits are drawn from [base/2, base] with base doubling per attempt, so
+        parallel collectors do not retry in lockstep. Rate limit errors start
+        from a larger base than other failures and pause the rate limiter
+        instead of sleeping, so every collector sharing it backs off too.
 
         Args:
             func: Function to execute
@@ -67,19 +297,84 @@ class StockCollector:
                 return result
             except Exception as e:
                 if attempt < max_attempts - 1:
-                    wait_time = 2 ** attempt  # Exponential backoff: 1s, 2s, 4s
-                    logger.warning(f"Attempt {attempt + 1} failed for {self.symbol}: {e}. Retrying in {wait_time}s...")
-                    time.sleep(wait_time)
+                    rate_limited = isinstance(e, RATE_LIMIT_ERRORS)
+                    base = RATE_LIMIT_BACKOFF_BASE if rate_limited else 1
+                    wait_time = random.uniform(0.5, 1.0) * base * 2 ** attempt
+                    logger.warning("Attempt %d failed for %s: %s. Retrying in %.1fs...", attempt + 1, self.symbol, e, wait_time)
+                    if rate_limited:
+                        # The next _rate_limit() call waits out the pause
+                        self.rate_limiter.pause(wait_time)
+                    else:
+                        time.sleep(wait_time)
                 else:
-                    logger.error(f"All {max_attempts} attempts failed for {self.symbol}: {e}")
+                    logger.error("All %d attempts failed for %s: %s", max_attempts, self.symbol, e)
                     return None
 
     def _get_ticker(self):
         """Get or create yfinance Ticker object."""
         if self.ticker is None:
-            self.ticker = yf.Ticker(self.symbol)
+            self.ticker = _cached_ticker(self.symbol)
         return self.ticker
 
+    def _get_history(self) -> pd.DataFrame:
+        """
+        Get daily price history, fetched once per symbol.
+
+        The price methods all slice this one download instead of each
+        requesting their own period (5d, 2y, 5y are all within 5y).
+
+        Returns:
+            DataFrame with the last HISTORY_PERIOD of daily prices
+        """
+        with self._history_lock:
+            if self._history is None:
+                self._history = self._get_ticker().history(period=HISTORY_PERIOD)
+            return self._history
+
+    def _get_info(self) -> Dict[str, Any]:
+        """
+        Get ticker.info, fetched once per symbol.
+
+        fetch_stock_info and fetch_valuation_data both read it; it is one of
+        the slowest yfinance calls (a quoteSummary request).
+        """
+        with self._info_lock:
+            if self._info is None:
+                self._info = self._get_ticker().info
+            return self._info
+
+    def _get_fundamentals_timeseries(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get every fundamentals series this collector needs, in one request.
+
+        Asks Yahoo's fundamentals timeseries endpoint for all TIMESERIES_TYPES
+        at once, instead of ticker.quarterly_financials, quarterly_cashflow,
+        financials, cashflow and balance_sheet each making their own request
+        for every line item of a statement. Fetched once per symbol.
+
+        Returns:
+            Dict mapping timeseries type (e.g. 'quarterlyTotalRevenue') to its
+            reported points; types Yahoo has no data for are absent
+        """
+        with self._timeseries_lock:
+            if self._timeseries is None:
+                params = {
+                    'symbol': self.symbol,
+                    'type': ','.join(TIMESERIES_TYPES),
+                    'period1': int(datetime(2016, 12, 31).timestamp()),
+                    'period2': int(time.time()),
+                }
+                data = YfData(session=get_session()).get_raw_json(FUNDAMENTALS_TIMESERIES_URL.format(symbol=self.symbol), params=params)
+
+                series = {}
+                for result in (data.get('timeseries') or {}).get('result') or []:
+                    for key in TIMESERIES_TYPES:
+                        points = [point for point in result.get(key) or [] if point and point.get('reportedValue')]
+                        if points:
+                            series.setdefault(key, []).extend(points)
+                self._timeseries = series
+            return self._timeseries
+
     def fetch_stock_info(self) -> Dict[str, Any]:
         """
         Fetch basic stock information (name, sector, industry, etc.).
@@ -87,11 +382,10 @@ class StockCollector:
         Returns:
             Dict with stock metadata
         """
-        logger.info(f"Fetching stock info for {self.symbol}")
+        logger.debug("Fetching stock info for %s", self.symbol)
 
         def _fetch():
-            ticker = self._get_ticker()
-            info = ticker.info
+            info = self._get_info()
             return {
                 'symbol': self.symbol,
                 'company_name': info.get('longName') or info.get('shortName'),
@@ -102,7 +396,7 @@ class StockCollector:
 
         result = self._retry_with_backoff(_fetch)
         if result:
-            logger.info(f"Successfully fetched info for {self.symbol}: {result.get('company_name')}")
+            logger.debug("Successfully fetched info for %s: %s", self.symbol, result.get('company_name'))
         return result or {}
 
     def fetch_price_data(self) -> Dict[str, Any]:
@@ -112,14 +406,13 @@ class StockCollector:
         Returns:
             Dict with current price information
         """
-        logger.info(f"Fetching current price for {self.symbol}")
+        logger.debug("Fetching current price for %s", self.symbol)
 
         def _fetch():
-            ticker = self._get_ticker()
-            hist = ticker.history(period='5d')  # Get last 5 days to ensure we have recent data
+            hist = self._get_history()
 
             if hist.empty:
-                logger.warning(f"No price history available for {self.symbol}")
+                logger.warning("No price history available for %s", self.symbol)
                 return None
 
             # Get most recent close price
@@ -133,7 +426,7 @@ class StockCollector:
 
         result = self._retry_with_backoff(_fetch)
         if result:
-            logger.info(f"Current price for {self.symbol}: {result.get('last_close_price')}")
+            logger.debug("Current price for %s: %s", self.symbol, result.get('last_close_price'))
         return result or {}
 
     def fetch_historical_prices(self, months_ago: List[int] = [1, 3, 6, 9, 12]) -> Dict[int, float]:
@@ -146,40 +439,42 @@ class StockCollector:
         Returns:
             Dict mapping months_ago to prices
         """
-        logger.info(f"Fetching historical prices for {self.symbol}")
+        logger.debug("Fetching historical prices for %s", self.symbol)
 
         def _fetch():
-            ticker = self._get_ticker()
-
-            # Fetch 2 years of history to cover all requested periods
-            hist = ticker.history(period='2y')
+            # Shared history covers all requested periods
+            hist = self._get_history()
 
             if hist.empty:
-                logger.warning(f"No historical data available for {self.symbol}")
+                logger.warning("No historical data available for %s", self.symbol)
                 return {}
 
             prices = {}
-            today = pd.Timestamp.now(tz=hist.index.tz)  # Use same timezone as hist.index
-
-            for months in months_ago:
-                # Calculate target date (months ago, rounded to 30 calendar days)
-                target_date = today - pd.Timedelta(days=months * 30)
-
-                # Find closest available trading day (within 7 days tolerance)
-                tolerance = pd.Timedelta(days=7)
-                mask = (hist.index >= target_date - tolerance) & (hist.index <= target_date + tolerance)
-                available_dates = hist[mask]
-
-                if not available_dates.empty:
-                    # Get closest date
-                    time_diffs = abs(available_dates.index - target_date)
-                    closest_idx = time_diffs.argmin()
-                    closest_date = available_dates.index[closest_idx]
-                    price = float(available_dates.loc[closest_date, 'Close'])
-                    prices[months] = price
-                    logger.debug(f"{self.symbol}: {months}m ago = {price} (date: {closest_date.date()})")
+            today_ns = pd.Timestamp.now(tz=hist.index.tz).value  # Use same timezone as hist.index
+
+            # Target dates (months ago, rounded to 30 calendar days), all located
+            # in the ascending history index with one binary search
+            index_ns = hist.index.as_unit('ns').asi8
+            targets = today_ns - np.asarray(months_ago, dtype=np.int64) * _MONTH_NS
+            pos = np.searchsorted(index_ns, targets)
+            before = np.clip(pos - 1, 0, len(index_ns) - 1)
+            after = np.clip(pos, 0, len(index_ns) - 1)
+            diff_before = np.abs(index_ns[before] - targets)
+            diff_after = np.abs(index_ns[after] - targets)
+
+            # Closest trading day, the earlier one on a tie, within 7 days tolerance
+            closest = np.where(diff_after < diff_before, after, before)
+            found = np.minimum(diff_before, diff_after) <= _PRICE_DATE_TOLERANCE_NS
+            closes = hist['Close'].to_numpy()[closest]
+
+            debug_enabled = logger.isEnabledFor(logging.DEBUG)
+            for months, i, price, ok in zip(months_ago, closest, closes, found):
+                if ok:
+                    prices[months] = float(price)
+                    if debug_enabled:
+                        logger.debug("%s: %sm ago = %s (date: %s)", self.symbol, months, prices[months], hist.index[i].date())
                 else:
-                    logger.warning(f"No data found for {self.symbol} at {months}m ago")
+                    logger.warning("No data found for %s at %sm ago", self.symbol, months)
                     prices[months] = None
 
             return prices
@@ -194,206 +489,165 @@ class StockCollector:
         Returns:
             Dict with high/low prices for each period
         """
-        logger.info(f"Calculating high/low for {self.symbol}")
+        logger.debug("Calculating high/low for %s", self.symbol)
 
         def _fetch():
-            ticker = self._get_ticker()
-
-            # Fetch enough history for all periods
-            hist = ticker.history(period='5y')
+            # Shared history covers all periods
+            hist = self._get_history()
 
             if hist.empty:
-                logger.warning(f"No historical data for high/low calculation: {self.symbol}")
+                logger.warning("No historical data for high/low calculation: %s", self.symbol)
                 return {}
 
-            today = pd.Timestamp.now(tz=hist.index.tz)  # Use same timezone as hist.index
+            today_ns = pd.Timestamp.now(tz=hist.index.tz).value  # Use same timezone as hist.index
             results = {}
 
-            # 52-week (1 year)
-            one_year_ago = today - pd.Timedelta(days=365)
-            mask_52w = hist.index >= one_year_ago
-            if mask_52w.any():
-                results['week_52_high'] = float(hist[mask_52w]['High'].max())
-                results['week_52_low'] = float(hist[mask_52w]['Low'].min())
-
-            # 3-year
-            three_years_ago = today - pd.Timedelta(days=3*365)
-            mask_3y = hist.index >= three_years_ago
-            if mask_3y.any():
-                results['year_3_high'] = float(hist[mask_3y]['High'].max())
-                results['year_3_low'] = float(hist[mask_3y]['Low'].min())
-
-            # 5-year
-            five_years_ago = today - pd.Timedelta(days=5*365)
-            mask_5y = hist.index >= five_years_ago
-            if mask_5y.any():
-                results['year_5_high'] = float(hist[mask_5y]['High'].max())
-                results['year_5_low'] = float(hist[mask_5y]['Low'].min())
-
-            logger.info(f"High/low calculated for {self.symbol}: 52w=[{results.get('week_52_low')}-{results.get('week_52_high')}]")
+            # Running high/low from each day to the end of the ascending history,
+            # built in one reverse pass (fmax/fmin skip NaN like pandas max/min)
+            highs = np.fmax.accumulate(hist['High'].to_numpy(dtype=float)[::-1])[::-1]
+            lows = np.fmin.accumulate(hist['Low'].to_numpy(dtype=float)[::-1])[::-1]
+
+            # First trading day on or after each period's start date
+            positions = np.searchsorted(hist.index.as_unit('ns').asi8, today_ns - _HIGH_LOW_SPANS_NS)
+
+            for period, pos in zip(_HIGH_LOW_PERIODS, positions):
+                if pos < len(highs):
+                    results[f'{period}_high'] = float(highs[pos])
+                    results[f'{period}_low'] = float(lows[pos])
+
+            logger.debug("High/low calculated for %s: 52w=[%s-%s]", self.symbol, results.get('week_52_low'), results.get('week_52_high'))
             return results
 
         result = self._retry_with_backoff(_fetch)
         return result or {}
 
-    def fetch_quarterly_fundamentals(self, years: int = 5) -> List[Dict[str, Any]]:
+    def fetch_quarterly_fundamentals_frame(self, years: int = 5) -> pd.DataFrame:
         """
-        Fetch quarterly fundamental data for the last N years.
+        Fetch quarterly fundamental data for the last N years as columns.
 
         Args:
             years: Number of years to fetch (default 5)
 
         Returns:
-            List of dicts with quarterly financial data
+            DataFrame with one row per quarter: symbol, fiscal_year (int16),
+            fiscal_quarter (int8), quarter_end_date and the float64
+            FUNDAMENTALS_FIELDS (NaN where not reported); empty if unavailable
         """
-        logger.info(f"Fetching quarterly fundamentals for {self.symbol} (last {years} years)")
+        logger.debug("Fetching quarterly fundamentals for %s (last %d years)", self.symbol, years)
 
         def _fetch():
-            ticker = self._get_ticker()
-
             try:
-                # Get quarterly financials
-                quarterly_income = ticker.quarterly_financials
-                quarterly_cashflow = ticker.quarterly_cashflow
+                # Get quarterly financials from the shared timeseries request
+                series = self._get_fundamentals_timeseries()
+                quarterly_income = _timeseries_statement(series, 'quarterly', INCOME_FIELDS)
+                quarterly_cashflow = _timeseries_statement(series, 'quarterly', CASHFLOW_FIELDS)
 
                 if quarterly_income is None or quarterly_income.empty:
-                    logger.warning(f"No quarterly financials available for {self.symbol}")
-                    return []
-
-                results = []
-                cutoff_date = datetime.now() - timedelta(days=years*365)
-
-                # Process each quarter
-                for col in quarterly_income.columns:
-                    quarter_date = col
-
-                    # Skip if older than cutoff
-                    if quarter_date < cutoff_date:
-                        continue
-
-                    # Extract financial metrics
-                    quarter_data = {
-                        'symbol': self.symbol,
-                        'fiscal_year': quarter_date.year,
-                        'fiscal_quarter': (quarter_date.month - 1) // 3 + 1,  # Calculate quarter (1-4)
-                        'quarter_end_date': quarter_date.date(),
-                    }
-
-                    # Revenue (Total Revenue or Operating Revenue)
-                    if 'Total Revenue' in quarterly_income.index:
-                        quarter_data['revenue'] = float(quarterly_income.loc['Total Revenue', col]) if pd.notna(quarterly_income.loc['Total Revenue', col]) else None
-
-                    # Gross Profit
-                    if 'Gross Profit' in quarterly_income.index:
-                        quarter_data['gross_profit'] = float(quarterly_income.loc['Gross Profit', col]) if pd.notna(quarterly_income.loc['Gross Profit', col]) else None
-
-                    # Net Income
-                    if 'Net Income' in quarterly_income.index:
-                        quarter_data['net_income'] = float(quarterly_income.loc['Net Income', col]) if pd.notna(quarterly_income.loc['Net Income', col]) else None
-
-                    # Operating Cash Flow
-                    if quarterly_cashflow is not None and not quarterly_cashflow.empty:
-                        if 'Operating Cash Flow' in quarterly_cashflow.index and col in quarterly_cashflow.columns:
-                            quarter_data['operating_cash_flow'] = float(quarterly_cashflow.loc['Operating Cash Flow', col]) if pd.notna(quarterly_cashflow.loc['Operating Cash Flow', col]) else None
-
-                        # Capital Expenditure
-                        if 'Capital Expenditure' in quarterly_cashflow.index and col in quarterly_cashflow.columns:
-                            quarter_data['capital_expenditure'] = float(quarterly_cashflow.loc['Capital Expenditure', col]) if pd.notna(quarterly_cashflow.loc['Capital Expenditure', col]) else None
+                    logger.warning("No quarterly financials available for %s", self.symbol)
+                    return None
 
-                        # Free Cash Flow
-                        if 'Free Cash Flow' in quarterly_cashflow.index and col in quarterly_cashflow.columns:
-                            quarter_data['free_cash_flow'] = float(quarterly_cashflow.loc['Free Cash Flow', col]) if pd.notna(quarterly_cashflow.loc['Free Cash Flow', col]) else None
+                cutoff_date = pd.Timestamp.now().normalize() - pd.Timedelta(days=years * 365)
 
-                    results.append(quarter_data)
+                # All quarters' fields extracted at once
+                fields = _statement_frame(quarterly_income, quarterly_cashflow, cutoff_date)
+                results = _fundamentals_frame(self.symbol, fields, quarterly=True)
 
-                logger.info(f"Fetched {len(results)} quarters of data for {self.symbol}")
+                logger.debug("Fetched %d quarters of data for %s", len(results), self.symbol)
                 return results
 
             except Exception as e:
-                logger.error(f"Error fetching quarterly fundamentals for {self.symbol}: {e}")
-                return []
+                logger.error("Error fetching quarterly fundamentals for %s: %s", self.symbol, e)
+                return None
 
         result = self._retry_with_backoff(_fetch)
-        return result or []
+        if result is None:
+            return _fundamentals_frame(self.symbol, _statement_frame(pd.DataFrame(), None, None), quarterly=True)
+        return result
 
-    def fetch_annual_fundamentals(self, years: int = 5) -> List[Dict[str, Any]]:
+    def fetch_quarterly_fundamentals(self, years: int = 5) -> List[Dict[str, Any]]:
         """
-        Fetch annual fundamental data for the last N years.
+        Fetch quarterly fundamental data for the last N years.
 
         Args:
             years: Number of years to fetch (default 5)
 
         Returns:
-            List of dicts with annual financial data
+            List of dicts with quarterly financial data
         """
-        logger.info(f"Fetching annual fundamentals for {self.symbol} (last {years} years)")
+        return fundamentals_records(self.fetch_quarterly_fundamentals_frame(years))
 
-        def _fetch():
-            ticker = self._get_ticker()
+    def fetch_annual_fundamentals_frame(self, years: int = 5) -> pd.DataFrame:
+        """
+        Fetch annual fundamental data for the last N years as columns.
 
-            try:
-                # Get annual financials
-                annual_income = ticker.financials  # This gives annual by default
-                annual_cashflow = ticker.cashflow
+        Args:
+            years: Number of years to fetch (default 5)
 
-                if annual_income is None or annual_income.empty:
-                    logger.warning(f"No annual financials available for {self.symbol}")
-                    return []
+        Returns:
+            DataFrame with one row per year: symbol, fiscal_year (int16),
+            year_end_date and the float64 FUNDAMENTALS_FIELDS (NaN where not
+            reported); empty if unavailable
+        """
+        logger.debug("Fetching annual fundamentals for %s (last %d years)", self.symbol, years)
 
-                results = []
-                cutoff_date = datetime.now() - timedelta(days=years*365)
+        def _fetch():
+            try:
+                # Get annual financials from the shared timeseries request
+                series = self._get_fundamentals_timeseries()
+                annual_income = _timeseries_statement(series, 'annual', INCOME_FIELDS)
+                annual_cashflow = _timeseries_statement(series, 'annual', CASHFLOW_FIELDS)
 
-                # Process each year
-                for col in annual_income.columns:
-                    year_date = col
+                if annual_income is None or annual_income.empty:
+                    logger.warning("No annual financials available for %s", self.symbol)
+                    return None
 
-                    # Skip if older than cutoff
-                    if year_date < cutoff_date:
-                        continue
+                cutoff_date = pd.Timestamp.now().normalize() - pd.Timedelta(days=years * 365)
 
-                    # Extract financial metrics
-                    year_data = {
-                        'symbol': self.symbol,
-                        'fiscal_year': year_date.year,
-                        'year_end_date': year_date.date(),
-                    }
+                # All years' fields extracted at once
+                fields = _statement_frame(annual_income, annual_cashflow, cutoff_date)
+                results = _fundamentals_frame(self.symbol, fields, quarterly=False)
 
-                    # Revenue (Total Revenue or Operating Revenue)
-                    if 'Total Revenue' in annual_income.index:
-                        year_data['revenue'] = float(annual_income.loc['Total Revenue', col]) if pd.notna(annual_income.loc['Total Revenue', col]) else None
+                logger.debug("Fetched %d years of data for %s", len(results), self.symbol)
+                return results
 
-                    # Gross Profit
-                    if 'Gross Profit' in annual_income.index:
-                        year_data['gross_profit'] = float(annual_income.loc['Gross Profit', col]) if pd.notna(annual_income.loc['Gross Profit', col]) else None
+            except Exception as e:
+                logger.error("Error fetching annual fundamentals for %s: %s", self.symbol, e)
+                return None
 
-                    # Net Income
-                    if 'Net Income' in annual_income.index:
-                        year_data['net_income'] = float(annual_income.loc['Net Income', col]) if pd.notna(annual_income.loc['Net Income', col]) else None
+        result = self._retry_with_backoff(_fetch)
+        if result is None:
+            return _fundamentals_frame(self.symbol, _statement_frame(pd.DataFrame(), None, None), quarterly=False)
+        return result
 
-                    # Operating Cash Flow
-                    if annual_cashflow is not None and not annual_cashflow.empty:
-                        if 'Operating Cash Flow' in annual_cashflow.index and col in annual_cashflow.columns:
-                            year_data['operating_cash_flow'] = float(annual_cashflow.loc['Operating Cash Flow', col]) if pd.notna(annual_cashflow.loc['Operating Cash Flow', col]) else None
+    def fetch_annual_fundamentals(self, years: int = 5) -> List[Dict[str, Any]]:
+        """
+        Fetch annual fundamental data for the last N years.
 
-                        # Capital Expenditure
-                        if 'Capital Expenditure' in annual_cashflow.index and col in annual_cashflow.columns:
-                            year_data['capital_expenditure'] = float(annual_cashflow.loc['Capital Expenditure', col]) if pd.notna(annual_cashflow.loc['Capital Expenditure', col]) else None
+        Args:
+            years: Number of years to fetch (default 5)
 
-                        # Free Cash Flow
-                        if 'Free Cash Flow' in annual_cashflow.index and col in annual_cashflow.columns:
-                            year_data['free_cash_flow'] = float(annual_cashflow.loc['Free Cash Flow', col]) if pd.notna(annual_cashflow.loc['Free Cash Flow', col]) else None
+        Returns:
+            List of dicts with annual financial data
+        """
+        return fundamentals_records(self.fetch_annual_fundamentals_frame(years))
 
-                    results.append(year_data)
+    def _fetch_stockholders_equity(self) -> Tuple[Optional[float], Optional[str]]:
+        """
+        Fetch the most recent annual Stockholders Equity from the balance sheet.
 
-                logger.info(f"Fetched {len(results)} years of data for {self.symbol}")
-                return results
+        Reads the annualStockholdersEquity series from the shared timeseries
+        request, instead of ticker.balance_sheet, which downloads every balance
+        sheet line and builds a DataFrame from it.
 
-            except Exception as e:
-                logger.error(f"Error fetching annual fundamentals for {self.symbol}: {e}")
-                return []
+        Returns:
+            Tuple of (equity, 'YYYY-MM-DD' date), or (None, None) if not reported
+        """
+        points = self._get_fundamentals_timeseries().get('annualStockholdersEquity')
+        if not points:
+            return None, None
 
-        result = self._retry_with_backoff(_fetch)
-        return result or []
+        latest = max(points, key=lambda point: point['asOfDate'])
+        return float(latest['reportedValue']['raw']), latest['asOfDate']
 
     def fetch_valuation_data(self) -> Dict[str, Any]:
         """
@@ -402,11 +656,10 @@ class StockCollector:
         Returns:
             Dict with valuation metrics
         """
-        logger.info(f"Fetching valuation data for {self.symbol}")
+        logger.debug("Fetching valuation data for %s", self.symbol)
 
         def _fetch():
-            ticker = self._get_ticker()
-            info = ticker.info
+            info = self._get_info()
 
             # Get market cap
             market_cap = info.get('marketCap')
@@ -425,24 +678,17 @@ class StockCollector:
 
             # 1. Try to get from balance sheet (most reliable for TOTAL value)
             try:
-                balance_sheet = ticker.balance_sheet
-                if balance_sheet is not None and not balance_sheet.empty:
-                    # Get the most recent balance sheet date (first column)
-                    balance_sheet_date = str(balance_sheet.columns[0].date())
-
-                    if 'Stockholders Equity' in balance_sheet.index:
-                        # Get most recent value (first column)
-                        book_value = float(balance_sheet.loc['Stockholders Equity'].iloc[0])
-                        if pd.notna(book_value):
-                            logger.debug(f"{self.symbol}: Got book value from balance sheet: {book_value}")
+                book_value, balance_sheet_date = self._fetch_stockholders_equity()
+                if book_value is not None:
+                    logger.debug("%s: Got book value from balance sheet: %s", self.symbol, book_value)
             except Exception as e:
-                logger.debug(f"{self.symbol}: Could not get book value from balance sheet: {e}")
+                logger.debug("%s: Could not get book value from balance sheet: %s", self.symbol, e)
 
             # 2. Try from info dict (totalStockholderEquity is total, not per share)
             if book_value is None:
                 book_value = info.get('totalStockholderEquity')
                 if book_value:
-                    logger.debug(f"{self.symbol}: Got book value from info: {book_value}")
+                    logger.debug("%s: Got book value from info: %s", self.symbol, book_value)
 
             # 3. Last resort: calculate from bookValue (per share) × shares outstanding
             if book_value is None:
@@ -450,7 +696,7 @@ class StockCollector:
                 shares_outstanding = info.get('sharesOutstanding')
                 if book_value_per_share and shares_outstanding:
                     book_value = book_value_per_share * shares_outstanding
-                    logger.debug(f"{self.symbol}: Calculated book value = {book_value_per_share} × {shares_outstanding} = {book_value}")
+                    logger.debug("%s: Calculated book value = %s × %s = %s", self.symbol, book_value_per_share, shares_outstanding, book_value)
 
             return {
                 'market_cap': market_cap,
@@ -462,30 +708,110 @@ class StockCollector:
 
         result = self._retry_with_backoff(_fetch)
         if result and result.get('market_cap'):
-            logger.info(f"Successfully fetched valuation data for {self.symbol}")
+            logger.debug("Successfully fetched valuation data for %s", self.symbol)
         else:
-            logger.warning(f"Limited valuation data available for {self.symbol}")
+            logger.warning("Limited valuation data available for %s", self.symbol)
         return result or {'market_cap': None, 'total_debt': 0, 'total_cash': 0, 'book_value': None, 'balance_sheet_date': None}
 
-    def collect_all_data(self) -> Dict[str, Any]:
+    def _collection_tasks(self, force_refresh: bool = False) -> Dict[str, Any]:
+        """
+        Map each collect_all_data key to the method that fetches it.
+
+        Fetches listed in CACHED_TASKS are wrapped to go through the on-disk
+        cache, keyed by task and symbol. Every fetch is also coalesced on that
+        key, so collectors running the same symbol at once (e.g. overlapping
+        collect_many calls) share one upstream fetch per task.
+
+        Args:
+            force_refresh: Bypass cached results and fetch everything again
+        """
+        tasks = {
+            'stock_info': self.fetch_stock_info,
+            'current_price': self.fetch_price_data,
+            'historical_prices': self.fetch_historical_prices,
+            'high_low': self.calculate_high_low,
+            'quarterly_fundamentals': self.fetch_quarterly_fundamentals,
+            'annual_fundamentals': self.fetch_annual_fundamentals,
+            'valuation_data': self.fetch_valuation_data
+        }
+        for key in CACHED_TASKS:
+            tasks[key] = partial(cached_object, key, self.symbol, tasks[key], force_refresh=force_refresh)
+        return {key: partial(coalesce, (key, self.symbol), fetch) for key, fetch in tasks.items()}
+
+    def collect_all_data(self, force_refresh: bool = False) -> Dict[str, Any]:
         """
         Collect all data for this stock (info, prices, fundamentals).
 
+        The fetches are independent and I/O bound, so they run on a thread
+        pool and their network round trips overlap; the shared history and
+        info memos are lock-protected for this.
+
+        Args:
+            force_refresh: Bypass cached results and fetch everything again
+
         Returns:
             Dict containing all collected data
         """
-        logger.info(f"Collecting all data for {self.symbol}")
-
-        data = {
-            'symbol': self.symbol,
-            'stock_info': self.fetch_stock_info(),
-            'current_price': self.fetch_price_data(),
-            'historical_prices': self.fetch_historical_prices(),
-            'high_low': self.calculate_high_low(),
-            'quarterly_fundamentals': self.fetch_quarterly_fundamentals(),
-            'annual_fundamentals': self.fetch_annual_fundamentals(),
-            'valuation_data': self.fetch_valuation_data()
-        }
+        logger.info("Collecting all data for %s", self.symbol)
+
+        tasks = self._collection_tasks(force_refresh)
+        with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+            futures = {key: executor.submit(fetch) for key, fetch in tasks.items()}
+            data = {'symbol': self.symbol, **{key: future.result() for key, future in futures.items()}}
 
-        logger.info(f"Data collection complete for {self.symbol}")
+        logger.info("Data collection complete for %s", self.symbol)
         return data
+
+    async def collect_all_data_async(self, force_refresh: bool = False) -> Dict[str, Any]:
+        """
+        Collect all data for this stock with the fetches running concurrently.
+
+        yfinance is blocking, so each fetch runs in the event loop's default
+        executor; their network round trips overlap instead of adding up.
+
+        Args:
+            force_refresh: Bypass cached results and fetch everything again
+
+        Returns:
+            Dict containing all collected data (same shape as collect_all_data)
+        """
+        logger.info("Collecting all data for %s (async)", self.symbol)
+
+        loop = asyncio.get_running_loop()
+        tasks = self._collection_tasks(force_refresh)
+        results = await asyncio.gather(*(loop.run_in_executor(None, fetch) for fetch in tasks.values()))
+
+        data = {'symbol': self.symbol, **dict(zip(tasks, results))}
+
+        logger.info("Data collection complete for %s", self.symbol)
+        return data
+
+
+async def collect_many(symbols: List[str], concurrency: int = CONCURRENCY_LIMIT,
+                       force_refresh: bool = False, **collector_kwargs) -> Dict[str, Dict[str, Any]]:
+    """
+    Collect all data for several stocks concurrently.
+
+    Args:
+        symbols: Stock symbols to collect
+        concurrency: Maximum number of stocks collected at once
+        force_refresh: Bypass cached results and fetch everything again
+        **collector_kwargs: Passed to each StockCollector (e.g. rate_limit_delay)
+
+    Returns:
+        Dict mapping symbol to its collect_all_data result, or to the
+        exception raised while collecting it (one failure does not cancel the rest)
+    """
+    # One limiter for all stocks, so running them at once does not multiply the rate
+    if 'rate_limiter' not in collector_kwargs:
+        collector_kwargs['rate_limiter'] = RateLimiter(collector_kwargs.get('rate_limit_delay', 0.5),
+                                                       burst=RATE_LIMIT_BURST)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _collect(symbol: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await StockCollector(symbol, **collector_kwargs).collect_all_data_async(force_refresh)
+
+    results = await asyncio.gather(*(_collect(symbol) for symbol in symbols), return_exceptions=True)
+    return dict(zip(symbols, results))
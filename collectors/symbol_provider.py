@@ -3,12 +3,144 @@ Stock Symbol Provider for Tadawul Hawk.
 Fetches Tadawul (Saudi Stock Exchange) stock symbols using yfinance/Yahoo Finance.
 """
 
-import yfinance as yf
-from typing import List, Set, Optional
-from utils import get_logger, validate_symbol
+import random
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import FrozenSet, List, Set, Optional, Tuple
+from config import Config
+from utils import get_logger, validate_symbol, RateLimiter
 
 logger = get_logger(__name__)
 
+# Symbols probed at once when validate_sample falls back to per-symbol checks
+VALIDATION_WORKERS = 8
+
+# Static symbol list used when yfinance cannot list the exchange
+SYMBOL_FILE = Path(__file__).parent.parent / 'data' / 'tadawul_symbols.txt'
+
+# Major Tadawul stocks by sector, used when no symbol file is available;
+# validated once here rather than on every fallback
+BUILTIN_SYMBOLS: FrozenSet[str] = frozenset(symbol for symbol in (
+    # Energy & Petrochemicals
+    '2222.SR',  # Saudi Aramco
+    '2010.SR',  # SABIC
+    '2020.SR',  # SABIC Agri-Nutrients
+    '2090.SR',  # Rabigh Refining
+    '2060.SR',  # Advanced Petrochemical
+    '2310.SR',  # Sipchem
+    '2350.SR',  # Saudi Kayan
+
+    # Banking
+    '1180.SR',  # Al Rajhi Bank
+    '1120.SR',  # Al Rajhi Banking
+    '1010.SR',  # Riyad Bank
+    '1020.SR',  # Bank AlBilad
+    '1030.SR',  # Saudi Investment Bank
+    '1050.SR',  # Banque Saudi Fransi
+    '1060.SR',  # Bank AlJazira
+    '1080.SR',  # Arab National Bank
+    '1140.SR',  # Alinma Bank
+
+    # Telecommunications
+    '7010.SR',  # Saudi Telecom Company (STC)
+    '7020.SR',  # Etihad Etisalat (Mobily)
+    '7030.SR',  # Zain Saudi Arabia
+
+    # Retail & Consumer
+    '4001.SR',  # Jarir Marketing
+    '4050.SR',  # Herfy Food Services
+    '4061.SR',  # Abdullah Al Othaim Markets
+
+    # Real Estate
+    '4150.SR',  # Emaar The Economic City
+    '4160.SR',  # Jabal Omar Development
+
+    # Industrial
+    '2110.SR',  # Saudi Basic Industries
+    '2250.SR',  # Maaden
+    '2270.SR',  # Savola Group
+    '2280.SR',  # Almarai Company
+
+    # Insurance (sample)
+    '8010.SR',  # Tawuniya
+    '8012.SR',  # Bupa Arabia
+    '8020.SR',  # Malath Insurance
+    '8030.SR',  # Medgulf
+    '8050.SR',  # Salama Insurance
+) if validate_symbol(symbol))
+
+
+@lru_cache(maxsize=1)
+def _yfinance_listing() -> Optional[FrozenSet[str]]:
+    """
+    Attempt to list all Tadawul stocks using yfinance, once per process.
+
+    This explores yfinance capabilities to get exchange listings.
+    Note: This is experimental and may not work if yfinance doesn't
+    support exchange-level queries for Tadawul.
+
+    Returns:
+        Listed symbols, or None if yfinance cannot list the exchange
+    """
+    import yfinance as yf  # deferred: loading the static list must not pay for it
+
+    logger.info("Attempting to fetch symbols from Yahoo Finance API...")
+
+    # Method 1: Try using yfinance Screener (if available)
+    try:
+        # Check if yfinance has a Screener class
+        if hasattr(yf, 'Screener'):
+            screener = yf.Screener()
+            # Try to get Tadawul stocks
+            # Note: This is speculative - may not work
+            screener.set_body({
+                'query': {'operator': 'EQ', 'operands': ['exchange', 'SAU']}
+            })
+            data = screener.response
+            if data and 'quotes' in data:
+                symbols = frozenset(quote['symbol'] for quote in data['quotes'] if quote.get('symbol'))
+                logger.info(f"Fetched {len(symbols)} symbols from yfinance Screener")
+                return symbols
+    except Exception as e:
+        logger.debug(f"Screener method failed: {e}")
+
+    # Method 2: Try querying a known index ticker
+    # Tadawul All Share Index (TASI) - might have constituents
+    try:
+        tasi = yf.Ticker('TASI.SR')  # or '^TASI'
+        # Some index tickers expose their constituents
+        if hasattr(tasi, 'constituents'):
+            constituents = tasi.constituents
+            if constituents:
+                symbols = frozenset(constituents)
+                logger.info(f"Fetched {len(symbols)} symbols from TASI constituents")
+                return symbols
+    except Exception as e:
+        logger.debug(f"Index constituents method failed: {e}")
+
+    # If we reach here, yfinance doesn't support exchange listing
+    return None
+
+
+@lru_cache(maxsize=1)
+def _read_symbol_file(symbol_file: Path, mtime_ns: int) -> FrozenSet[str]:
+    """
+    Parse a symbol file, cached per (path, modification time).
+
+    Args:
+        symbol_file: File with one symbol per line, or SYMBOL|COMPANY_NAME|EXCHANGE
+        mtime_ns: File modification time; part of the cache key only
+
+    Returns:
+        Valid symbols in the file
+    """
+    lines = (line.strip() for line in symbol_file.read_text(encoding='utf-8').splitlines())
+    # Skip comments and empty lines; pipe-delimited lines are SYMBOL|COMPANY_NAME|EXCHANGE
+    candidates = (line.split('|', 1)[0].strip() for line in lines if line and not line.startswith('#'))
+    return frozenset(symbol for symbol in candidates if symbol and validate_symbol(symbol))
+
 
 class SymbolProvider:
     """
@@ -21,8 +153,20 @@ class SymbolProvider:
 
     def __init__(self):
         self.symbols: Set[str] = set()
+        self._sorted: Tuple[str, ...] = ()
         logger.info("SymbolProvider initialized")
 
+    def _sorted_symbols(self) -> Tuple[str, ...]:
+        """
+        Get the symbols as a sorted tuple, rebuilt only when the set has grown.
+
+        Symbols are only ever added, so a size change is enough to tell that
+        the cached tuple is stale.
+        """
+        if len(self._sorted) != len(self.symbols):
+            self._sorted = tuple(sorted(self.symbols))
+        return self._sorted
+
     def get_all_symbols(self) -> List[str]:
         """
         Get all Tadawul stock symbols.
@@ -41,7 +185,7 @@ class SymbolProvider:
             self._load_static_symbols()
 
         # Convert to list and sort
-        symbol_list = sorted(list(self.symbols))
+        symbol_list = list(self._sorted_symbols())
 
         logger.info(f"Total symbols loaded: {len(symbol_list)}")
         if symbol_list:
@@ -53,49 +197,13 @@ class SymbolProvider:
         """
         Attempt to fetch all Tadawul stocks using yfinance.
 
-        This method explores yfinance capabilities to get exchange listings.
-        Note: This is experimental and may not work if yfinance doesn't
-        support exchange-level queries for Tadawul.
+        The probe runs once per process (see _yfinance_listing); later calls
+        reuse its outcome.
         """
-        logger.info("Attempting to fetch symbols from Yahoo Finance API...")
-
-        # Method 1: Try using yfinance Screener (if available)
-        try:
-            # Check if yfinance has a Screener class
-            if hasattr(yf, 'Screener'):
-                screener = yf.Screener()
-                # Try to get Tadawul stocks
-                # Note: This is speculative - may not work
-                screener.set_body({
-                    'query': {'operator': 'EQ', 'operands': ['exchange', 'SAU']}
-                })
-                data = screener.response
-                if data and 'quotes' in data:
-                    for quote in data['quotes']:
-                        symbol = quote.get('symbol')
-                        if symbol:
-                            self.symbols.add(symbol)
-                    logger.info(f"Fetched {len(self.symbols)} symbols from yfinance Screener")
-                    return
-        except Exception as e:
-            logger.debug(f"Screener method failed: {e}")
-
-        # Method 2: Try querying a known index ticker
-        # Tadawul All Share Index (TASI) - might have constituents
-        try:
-            tasi = yf.Ticker('TASI.SR')  # or '^TASI'
-            # Some index tickers expose their constituents
-            if hasattr(tasi, 'constituents'):
-                constituents = tasi.constituents
-                if constituents:
-                    self.symbols.update(constituents)
-                    logger.info(f"Fetched {len(self.symbols)} symbols from TASI constituents")
-                    return
-        except Exception as e:
-            logger.debug(f"Index constituents method failed: {e}")
-
-        # If we reach here, yfinance doesn't support exchange listing
-        raise Exception("yfinance does not support Tadawul exchange listing")
+        listing = _yfinance_listing()
+        if listing is None:
+            raise Exception("yfinance does not support Tadawul exchange listing")
+        self.symbols.update(listing)
 
     def _load_static_symbols(self):
         """
@@ -104,26 +212,11 @@ class SymbolProvider:
         """
         # First try to load from file
         try:
-            from pathlib import Path
-            symbol_file = Path(__file__).parent.parent / 'data' / 'tadawul_symbols.txt'
+            symbol_file = SYMBOL_FILE
 
             if symbol_file.exists():
-                with open(symbol_file, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        line = line.strip()
-                        # Skip comments and empty lines
-                        if not line or line.startswith('#'):
-                            continue
-                        # Handle pipe-delimited format: SYMBOL|COMPANY_NAME|EXCHANGE
-                        if '|' in line:
-                            parts = line.split('|')
-                            symbol = parts[0].strip() if parts else None
-                        else:
-                            # Handle simple format: just symbol
-                            symbol = line
-
-                        if symbol and validate_symbol(symbol):
-                            self.symbols.add(symbol)
+                # Parsed once per file version; edits change the mtime key
+                self.symbols.update(_read_symbol_file(symbol_file, symbol_file.stat().st_mtime_ns))
 
                 logger.info(f"Loaded {len(self.symbols)} symbols from {symbol_file}")
                 return
@@ -141,61 +234,9 @@ class SymbolProvider:
         Note: This is a starter list covering major companies.
         Should be replaced with complete list via research or file.
         """
-        # Major Tadawul stocks by sector
-        major_symbols = [
-            # Energy & Petrochemicals
-            '2222.SR',  # Saudi Aramco
-            '2010.SR',  # SABIC
-            '2020.SR',  # SABIC Agri-Nutrients
-            '2090.SR',  # Rabigh Refining
-            '2060.SR',  # Advanced Petrochemical
-            '2310.SR',  # Sipchem
-            '2350.SR',  # Saudi Kayan
-
-            # Banking
-            '1180.SR',  # Al Rajhi Bank
-            '1120.SR',  # Al Rajhi Banking
-            '1010.SR',  # Riyad Bank
-            '1020.SR',  # Bank AlBilad
-            '1030.SR',  # Saudi Investment Bank
-            '1050.SR',  # Banque Saudi Fransi
-            '1060.SR',  # Bank AlJazira
-            '1080.SR',  # Arab National Bank
-            '1140.SR',  # Alinma Bank
-
-            # Telecommunications
-            '7010.SR',  # Saudi Telecom Company (STC)
-            '7020.SR',  # Etihad Etisalat (Mobily)
-            '7030.SR',  # Zain Saudi Arabia
-
-            # Retail & Consumer
-            '4001.SR',  # Jarir Marketing
-            '4050.SR',  # Herfy Food Services
-            '4061.SR',  # Abdullah Al Othaim Markets
-
-            # Real Estate
-            '4150.SR',  # Emaar The Economic City
-            '4160.SR',  # Jabal Omar Development
-
-            # Industrial
-            '2110.SR',  # Saudi Basic Industries
-            '2250.SR',  # Maaden
-            '2270.SR',  # Savola Group
-            '2280.SR',  # Almarai Company
-
-            # Insurance (sample)
-            '8010.SR',  # Tawuniya
-            '8012.SR',  # Bupa Arabia
-            '8020.SR',  # Malath Insurance
-            '8030.SR',  # Medgulf
-            '8050.SR',  # Salama Insurance
-        ]
-
-        for symbol in major_symbols:
-            if validate_symbol(symbol):
-                self.symbols.add(symbol)
-
-        logger.warning(f"Using built-in list with {len(major_symbols)} major stocks")
+        self.symbols |= BUILTIN_SYMBOLS
+
+        logger.warning(f"Using built-in list with {len(BUILTIN_SYMBOLS)} major stocks")
         logger.warning("For complete coverage, provide full symbol list in data/tadawul_symbols.txt")
 
     def validate_sample(self, sample_size: int = 5) -> dict:
@@ -213,27 +254,39 @@ class SymbolProvider:
 
         logger.info(f"Validating sample of {min(sample_size, len(self.symbols))} symbols...")
 
-        valid_count = 0
-        invalid_count = 0
+        import yfinance as yf
+        from .stock_collector import get_session
+
+        population = self._sorted_symbols()
+        sample = random.sample(population, min(sample_size, len(population)))
 
-        import random
-        sample = random.sample(list(self.symbols), min(sample_size, len(self.symbols)))
+        # One batched price download for the whole sample instead of a
+        # ticker.info request per symbol; a symbol is valid if it traded
+        try:
+            data = yf.download(sample, period='5d', group_by='ticker', threads=True,
+                               progress=False, session=get_session())
+        except Exception as e:
+            logger.debug(f"Batch validation download failed: {e}")
+            data = None
 
-        for symbol in sample:
-            try:
-                ticker = yf.Ticker(symbol)
-                info = ticker.info
+        downloaded = set()
+        if data is not None and not data.empty and isinstance(data.columns, pd.MultiIndex):
+            downloaded = set(data.columns.get_level_values(0))
 
-                if info and ('symbol' in info or 'shortName' in info or 'longName' in info):
-                    valid_count += 1
-                    logger.debug(f"✓ {symbol} is valid")
-                else:
-                    invalid_count += 1
-                    logger.debug(f"✗ {symbol} appears invalid")
+        if downloaded:
+            results = [bool(symbol in downloaded and data[symbol]['Close'].notna().any()) for symbol in sample]
+        else:
+            # Batch download unavailable: probe each symbol's info on a
+            # bounded thread pool, still spaced by the configured API delay
+            rate_limiter = RateLimiter(Config.API_RATE_LIMIT_DELAY)
+            with ThreadPoolExecutor(max_workers=VALIDATION_WORKERS) as executor:
+                results = list(executor.map(lambda symbol: self._probe_symbol(symbol, rate_limiter), sample))
 
-            except Exception as e:
-                invalid_count += 1
-                logger.debug(f"✗ {symbol} validation failed: {e}")
+        for symbol, is_valid in zip(sample, results):
+            logger.debug(f"✓ {symbol} is valid" if is_valid else f"✗ {symbol} appears invalid")
+
+        valid_count = sum(results)
+        invalid_count = len(sample) - valid_count
 
         success_rate = (valid_count / len(sample)) * 100 if sample else 0
 
@@ -248,6 +301,20 @@ class SymbolProvider:
 
         return results
 
+    @staticmethod
+    def _probe_symbol(symbol: str, rate_limiter: RateLimiter) -> bool:
+        """Check that yfinance knows a symbol by requesting its info."""
+        import yfinance as yf
+        from .stock_collector import get_session
+
+        try:
+            rate_limiter.wait()
+            info = yf.Ticker(symbol, session=get_session()).info
+            return bool(info and ('symbol' in info or 'shortName' in info or 'longName' in info))
+        except Exception as e:
+            logger.debug(f"✗ {symbol} validation failed: {e}")
+            return False
+
     def get_symbol_count(self) -> int:
         """Get total number of symbols."""
         return len(self.symbols)
@@ -256,8 +323,7 @@ class SymbolProvider:
         """Save symbols to a text file for reference."""
         try:
             with open(filepath, 'w') as f:
-                for symbol in sorted(self.symbols):
-                    f.write(f"{symbol}\n")
+                f.write("".join(f"{symbol}\n" for symbol in self._sorted_symbols()))
             logger.info(f"Symbols saved to {filepath}")
         except Exception as e:
             logger.error(f"Failed to save symbols to file: {e}")
@@ -9,26 +9,70 @@ from pathlib import Path
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent))
 
+import hashlib
 import requests
-from bs4 import BeautifulSoup
-import time
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+import lxml.etree
+import lxml.html
 import re
-from typing import Set, List
-from utils import get_logger, validate_symbol
+from typing import Set, List, Optional, Tuple
+from utils import get_logger, validate_symbol, RateLimiter, cached_file
 
 logger = get_logger(__name__)
 
+# Tadawul tickers are 4-digit codes
+TICKER_RE = re.compile(r'\b(\d{4})\b')
+
+# Visible page text: every text node outside script/style/template
+_PAGE_TEXT = lxml.etree.XPath('//text()[not(ancestor::script or ancestor::style or ancestor::template)]')
+
+# Pagination link patterns: "next" labels, bare page numbers, pagination containers
+_NEXT_LABEL_RE = re.compile(r'next|Next|NEXT|›|»', re.I)
+_PAGE_NUMBER_RE = re.compile(r'^\d+$')
+_PAGINATION_CLASS_RE = re.compile(r'pag', re.I)
+
+# Pagination pages fetched at once, and the spacing between any two requests
+# (each worker still waits about 1 second between its own requests)
+PAGINATION_WORKERS = 4
+PAGE_REQUEST_INTERVAL = 0.25
+
+# Consecutive pages without new symbols after which pagination stops
+PAGINATION_STALL_LIMIT = 2
+
+# Bytes read at a time when streaming a page to the cache
+PAGE_CHUNK_SIZE = 64 * 1024
+
+# Transient failures retried by the session itself, with 0.5s/1s/2s backoff
+# (Retry-After is honoured on 429/503); the last response still goes through
+# raise_for_status so a page that keeps failing is reported as before
+PAGE_RETRY = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 502, 503, 504),
+                   allowed_methods=frozenset({'GET'}), raise_on_status=False)
+
 
 class TadawulScraper:
     """
     Scrapes Saudi Exchange (Tadawul) website to get complete list of stock symbols.
     """
 
-    def __init__(self):
+    def __init__(self, force_refresh: bool = False):
+        """
+        Initialize the scraper.
+
+        Args:
+            force_refresh: Download every page again instead of reusing pages
+                           cached on disk (cache/tadawul_pages, kept for 1 day)
+        """
+        self.force_refresh = force_refresh
         self.base_url = "https://www.saudiexchange.sa"
         self.issuer_directory_url = f"{self.base_url}/wps/portal/saudiexchange/trading/participants-directory/issuer-directory"
         self.symbols: Set[str] = set()
+        self._sorted: Tuple[str, ...] = ()
         self.session = requests.Session()
+        # One pooled connection per pagination worker, retrying transient errors
+        self.session.mount('https://', HTTPAdapter(max_retries=PAGE_RETRY, pool_connections=PAGINATION_WORKERS,
+                                                   pool_maxsize=PAGINATION_WORKERS))
         # Use more realistic browser headers
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -57,97 +101,46 @@ class TadawulScraper:
 
         try:
             # Fetch the main page
-            response = self.session.get(self.issuer_directory_url, timeout=30)
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.content, 'lxml')
+            tree = self._get_page(self.issuer_directory_url)
 
             # Log the page structure for debugging
-            logger.debug(f"Page title: {soup.title.string if soup.title else 'No title'}")
+            title = tree.findtext('.//title')
+            logger.debug(f"Page title: {title if title is not None else 'No title'}")
 
-            # Try multiple strategies to extract stock symbols
-            self._extract_symbols_strategy_1(soup)  # Look for tables
-            self._extract_symbols_strategy_2(soup)  # Look for specific divs/sections
-            self._extract_symbols_strategy_3(soup)  # Look for ticker patterns in text
+            # Extract stock symbols from the page text
+            self._extract_symbols(tree)
 
             # Try to find and follow pagination links
-            self._follow_pagination_links(soup)
+            self._follow_pagination_links(tree)
 
             logger.info(f"Scraping complete. Found {len(self.symbols)} unique symbols")
 
-            # Convert to sorted list
-            symbol_list = sorted(list(self.symbols))
-
-            return symbol_list
+            return list(self._sorted_symbols())
 
         except Exception as e:
             logger.error(f"Failed to scrape Tadawul website: {e}")
             raise
 
-    def _extract_symbols_strategy_1(self, soup: BeautifulSoup):
-        """Strategy 1: Look for data in HTML tables."""
-        logger.debug("Trying strategy 1: Extracting from tables...")
-
-        tables = soup.find_all('table')
-        logger.debug(f"Found {len(tables)} tables")
-
-        for idx, table in enumerate(tables):
-            rows = table.find_all('tr')
-            logger.debug(f"Table {idx}: {len(rows)} rows")
-
-            for row in rows:
-                cells = row.find_all(['td', 'th'])
-                for cell in cells:
-                    text = cell.get_text().strip()
-
-                    # Look for 4-digit codes (Tadawul symbols are typically 4 digits)
-                    matches = re.findall(r'\b(\d{4})\b', text)
-                    for match in matches:
-                        symbol = f"{match}.SR"
-                        if validate_symbol(symbol):
-                            self.symbols.add(symbol)
-                            logger.debug(f"Found symbol (table): {symbol}")
-
-    def _extract_symbols_strategy_2(self, soup: BeautifulSoup):
-        """Strategy 2: Look for specific div/section structures."""
-        logger.debug("Trying strategy 2: Extracting from divs/sections...")
-
-        # Look for common div classes that might contain company listings
-        potential_containers = soup.find_all(['div', 'section', 'article'])
-
-        for container in potential_containers:
-            # Get all text from container
-            text = container.get_text()
-
-            # Look for 4-digit ticker patterns
-            matches = re.findall(r'\b(\d{4})\b', text)
-            for match in matches:
-                symbol = f"{match}.SR"
-                if validate_symbol(symbol):
-                    self.symbols.add(symbol)
-                    logger.debug(f"Found symbol (div): {symbol}")
-
-    def _extract_symbols_strategy_3(self, soup: BeautifulSoup):
-        """Strategy 3: Look for ticker patterns anywhere in text."""
-        logger.debug("Trying strategy 3: Pattern matching in all text...")
-
-        # Get all text from page
-        page_text = soup.get_text()
-
-        # Find all 4-digit numbers (potential tickers)
-        matches = re.findall(r'\b(\d{4})\b', page_text)
-
-        # Filter to reasonable range for Tadawul symbols
-        # Tadawul symbols typically range from 1000-9999
-        for match in matches:
-            ticker_num = int(match)
-            if 1000 <= ticker_num <= 9999:
-                symbol = f"{match}.SR"
-                if validate_symbol(symbol):
-                    self.symbols.add(symbol)
-                    logger.debug(f"Found symbol (pattern): {symbol}")
-
-    def _follow_pagination_links(self, soup: BeautifulSoup):
+    def _sorted_symbols(self) -> Tuple[str, ...]:
+        """Get the symbols as a sorted tuple, re-sorted only when the set has grown."""
+        if len(self._sorted) != len(self.symbols):
+            self._sorted = tuple(sorted(self.symbols))
+        return self._sorted
+
+    def _extract_symbols(self, tree: lxml.html.HtmlElement):
+        """
+        Collect every 4-digit ticker code in the page text.
+
+        One regex pass over the whole page covers what the old per-table,
+        per-container and whole-page scans found separately; the separator
+        keeps codes in adjacent cells from running together.
+        """
+        found = {f"{match}.SR" for match in TICKER_RE.findall(' '.join(_PAGE_TEXT(tree)))}
+        new_symbols = {symbol for symbol in found if validate_symbol(symbol)} - self.symbols
+        self.symbols.update(new_symbols)
+        logger.debug(f"Found {len(new_symbols)} new symbols on page")
+
+    def _follow_pagination_links(self, tree: lxml.html.HtmlElement):
         """Try to find and follow pagination links."""
         logger.debug("Looking for pagination...")
 
@@ -155,24 +148,23 @@ class TadawulScraper:
         pagination_links = []
 
         # Strategy 1: Look for "next" buttons/links
-        next_links = soup.find_all(['a', 'button'], text=re.compile(r'next|Next|NEXT|›|»', re.I))
-        pagination_links.extend(next_links)
+        pagination_links.extend(el for el in tree.iter('a', 'button')
+                                if _NEXT_LABEL_RE.search(el.text_content()))
 
         # Strategy 2: Look for numbered page links
-        page_links = soup.find_all('a', text=re.compile(r'^\d+$'))
-        pagination_links.extend(page_links)
+        pagination_links.extend(a for a in tree.iter('a')
+                                if _PAGE_NUMBER_RE.match(a.text_content()))
 
         # Strategy 3: Look for common pagination class names
-        pagination_divs = soup.find_all(['div', 'nav'], class_=re.compile(r'pag', re.I))
-        for div in pagination_divs:
-            links = div.find_all('a')
-            pagination_links.extend(links)
+        for container in tree.iter('div', 'nav'):
+            if _PAGINATION_CLASS_RE.search(container.get('class', '')):
+                pagination_links.extend(container.iter('a'))
 
         logger.debug(f"Found {len(pagination_links)} potential pagination links")
 
         # Try to follow pagination links (limit to avoid infinite loops)
         max_pages = 20
-        pages_visited = 1
+        urls = []
 
         for link in pagination_links[:max_pages]:
             href = link.get('href')
@@ -187,27 +179,79 @@ class TadawulScraper:
             else:
                 url = f"{self.issuer_directory_url}/{href}"
 
-            try:
-                logger.debug(f"Following pagination link: {url}")
-                response = self.session.get(url, timeout=30)
-                response.raise_for_status()
+            if url not in urls:
+                urls.append(url)
+
+        # The first page counts towards the limit
+        if len(urls) >= max_pages:
+            logger.warning(f"Reached max pages limit ({max_pages})")
+            urls = urls[:max_pages - 1]
+
+        # Fetch the pages in parallel batches, still spaced out to be polite to
+        # the host, and stop once consecutive pages stop adding symbols
+        rate_limiter = RateLimiter(PAGE_REQUEST_INTERVAL)
+        stalled = 0
+        with ThreadPoolExecutor(max_workers=PAGINATION_WORKERS) as executor:
+            for start in range(0, len(urls), PAGINATION_WORKERS):
+                batch = urls[start:start + PAGINATION_WORKERS]
+                for tree in executor.map(lambda url: self._fetch_page(url, rate_limiter), batch):
+                    if tree is None:
+                        continue
+                    found = len(self.symbols)
+                    self._extract_symbols(tree)
+                    stalled = stalled + 1 if len(self.symbols) == found else 0
+
+                if stalled >= PAGINATION_STALL_LIMIT:
+                    if start + PAGINATION_WORKERS < len(urls):
+                        logger.debug(f"No new symbols on the last {stalled} pages, "
+                                     f"skipping {len(urls) - start - PAGINATION_WORKERS} more")
+                    break
 
-                soup = BeautifulSoup(response.content, 'lxml')
+    def _fetch_page(self, url: str, rate_limiter: RateLimiter):
+        """
+        Fetch and parse one pagination page.
 
-                # Extract symbols from this page
-                self._extract_symbols_strategy_1(soup)
-                self._extract_symbols_strategy_2(soup)
+        Args:
+            url: Absolute page URL
+            rate_limiter: Limiter shared by the pagination workers
 
-                pages_visited += 1
-                time.sleep(1)  # Be polite, wait between requests
+        Returns:
+            Parsed page, or None if it could not be fetched
+        """
+        try:
+            logger.debug(f"Following pagination link: {url}")
+            return self._get_page(url, rate_limiter)
 
-                if pages_visited >= max_pages:
-                    logger.warning(f"Reached max pages limit ({max_pages})")
-                    break
+        except Exception as e:
+            logger.warning(f"Failed to fetch pagination page {url}: {e}")
+            return None
 
-            except Exception as e:
-                logger.warning(f"Failed to fetch pagination page {url}: {e}")
-                continue
+    def _get_page(self, url: str, rate_limiter: Optional[RateLimiter] = None) -> lxml.html.HtmlElement:
+        """
+        Get a parsed page, from the on-disk cache when a fresh copy exists.
+
+        A download streams the body to the cache file in chunks and lxml
+        parses that file directly, so the page is never held in memory as
+        one bytes object.
+
+        Args:
+            url: Absolute page URL
+            rate_limiter: Applied only when the page is actually downloaded
+
+        Returns:
+            Root element of the page
+        """
+        def _download(f):
+            if rate_limiter is not None:
+                rate_limiter.wait()
+            with self.session.get(url, timeout=30, stream=True) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(chunk_size=PAGE_CHUNK_SIZE):
+                    f.write(chunk)
+
+        name = f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}.html"
+        path = cached_file('tadawul_pages', name, _download, force_refresh=self.force_refresh)
+        return lxml.html.parse(str(path)).getroot()
 
     def save_symbols_to_file(self, filepath: str):
         """
@@ -220,15 +264,18 @@ class TadawulScraper:
             # Ensure directory exists
             Path(filepath).parent.mkdir(parents=True, exist_ok=True)
 
+            lines = [
+                "# Tadawul Stock Symbols",
+                f"# Scraped from: {self.issuer_directory_url}",
+                f"# Total symbols: {len(self.symbols)}",
+                "# Format: XXXX.SR (where XXXX is the 4-digit ticker)",
+                "#",
+                *self._sorted_symbols(),
+            ]
+
+            # Header and symbols written in one call
             with open(filepath, 'w') as f:
-                f.write("# Tadawul Stock Symbols\n")
-                f.write(f"# Scraped from: {self.issuer_directory_url}\n")
-                f.write(f"# Total symbols: {len(self.symbols)}\n")
-                f.write(f"# Format: XXXX.SR (where XXXX is the 4-digit ticker)\n")
-                f.write("#\n")
-
-                for symbol in sorted(self.symbols):
-                    f.write(f"{symbol}\n")
+                f.write("\n".join(lines) + "\n")
 
             logger.info(f"Symbols saved to {filepath}")
             logger.info(f"Total symbols saved: {len(self.symbols)}")
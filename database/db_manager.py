@@ -4,13 +4,14 @@ Handles PostgreSQL operations using SQLAlchemy ORM.
 """
 
 from datetime import datetime
-from typing import List, Optional, Dict, Any
-from sqlalchemy import create_engine, Column, Integer, String, Date, Numeric, Boolean, Text, ForeignKey, CheckConstraint, UniqueConstraint, text
+from typing import List, Optional, Dict, Any, Tuple
+from sqlalchemy import create_engine, event, Column, Integer, String, Date, Numeric, Boolean, Text, ForeignKey, CheckConstraint, UniqueConstraint, Index, DDL, FetchedValue, bindparam, select, text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship, Session
-from sqlalchemy.dialects.postgresql import TIMESTAMP
+from sqlalchemy.orm import sessionmaker, relationship, selectinload, Session
+from sqlalchemy.dialects.postgresql import TIMESTAMP, insert as pg_insert
 from sqlalchemy.sql import func
 from contextlib import contextmanager
+import psycopg2.extensions
 
 from config import Config
 from utils import get_logger
@@ -20,6 +21,18 @@ logger = get_logger(__name__)
 # SQLAlchemy Base
 Base = declarative_base()
 
+# Prices and financials are stored as NUMERIC but only ever used as floats.
+# The columns are declared asdecimal=False, and this typecaster has psycopg2
+# parse NUMERIC text straight into a float instead of building a Decimal first.
+NUMERIC_AS_FLOAT = psycopg2.extensions.new_type(
+    (1700,), 'NUMERIC_AS_FLOAT', lambda value, cursor: None if value is None else float(value)
+)
+
+
+def _register_numeric_as_float(dbapi_connection, connection_record):
+    """Install NUMERIC_AS_FLOAT on every new pooled connection."""
+    psycopg2.extensions.register_type(NUMERIC_AS_FLOAT, dbapi_connection)
+
 
 # ============================================
 # SQLAlchemy Models
@@ -39,13 +52,17 @@ class Stock(Base):
     currency = Column(String(10), default='SAR')
     is_active = Column(Boolean, default=True)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
-    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), server_onupdate=FetchedValue())
 
     # Relationships
-    price_history = relationship('PriceHistory', back_populates='stock', cascade='all, delete-orphan')
-    quarterly_fundamentals = relationship('QuarterlyFundamental', back_populates='stock', cascade='all, delete-orphan')
-    annual_fundamentals = relationship('AnnualFundamental', back_populates='stock', cascade='all, delete-orphan')
-    collection_logs = relationship('DataCollectionLog', back_populates='stock', cascade='all, delete-orphan')
+    price_history = relationship('PriceHistory', back_populates='stock',
+                                 cascade='all, delete-orphan', passive_deletes=True)
+    quarterly_fundamentals = relationship('QuarterlyFundamental', back_populates='stock',
+                                          cascade='all, delete-orphan', passive_deletes=True)
+    annual_fundamentals = relationship('AnnualFundamental', back_populates='stock',
+                                       cascade='all, delete-orphan', passive_deletes=True)
+    collection_logs = relationship('DataCollectionLog', back_populates='stock',
+                                   cascade='all, delete-orphan', passive_deletes=True)
 
     # Constraints
     __table_args__ = (
@@ -66,29 +83,29 @@ class PriceHistory(Base):
     data_date = Column(Date, nullable=False)
 
     # Current/Latest Price
-    last_close_price = Column(Numeric(12, 3))
+    last_close_price = Column(Numeric(12, 3, asdecimal=False))
 
     # Historical Prices
-    price_1m_ago = Column(Numeric(12, 3))
-    price_3m_ago = Column(Numeric(12, 3))
-    price_6m_ago = Column(Numeric(12, 3))
-    price_9m_ago = Column(Numeric(12, 3))
-    price_12m_ago = Column(Numeric(12, 3))
+    price_1m_ago = Column(Numeric(12, 3, asdecimal=False))
+    price_3m_ago = Column(Numeric(12, 3, asdecimal=False))
+    price_6m_ago = Column(Numeric(12, 3, asdecimal=False))
+    price_9m_ago = Column(Numeric(12, 3, asdecimal=False))
+    price_12m_ago = Column(Numeric(12, 3, asdecimal=False))
 
     # 52-week high/low
-    week_52_high = Column(Numeric(12, 3))
-    week_52_low = Column(Numeric(12, 3))
+    week_52_high = Column(Numeric(12, 3, asdecimal=False))
+    week_52_low = Column(Numeric(12, 3, asdecimal=False))
 
     # 3-year high/low
-    year_3_high = Column(Numeric(12, 3))
-    year_3_low = Column(Numeric(12, 3))
+    year_3_high = Column(Numeric(12, 3, asdecimal=False))
+    year_3_low = Column(Numeric(12, 3, asdecimal=False))
 
     # 5-year high/low
-    year_5_high = Column(Numeric(12, 3))
-    year_5_low = Column(Numeric(12, 3))
+    year_5_high = Column(Numeric(12, 3, asdecimal=False))
+    year_5_low = Column(Numeric(12, 3, asdecimal=False))
 
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
-    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), server_onupdate=FetchedValue())
 
     # Relationship
     stock = relationship('Stock', back_populates='price_history')
@@ -96,6 +113,8 @@ class PriceHistory(Base):
     # Constraints
     __table_args__ = (
         UniqueConstraint('stock_id', 'data_date', name='uq_price_stock_date'),
+        # Snapshots are appended in date order, so a BRIN index covers date-range scans cheaply
+        Index('idx_price_data_date', 'data_date', postgresql_using='brin'),
     )
 
     def __repr__(self):
@@ -113,15 +132,15 @@ class QuarterlyFundamental(Base):
     quarter_end_date = Column(Date, nullable=False)
 
     # Financial Metrics
-    revenue = Column(Numeric(18, 2))
-    gross_profit = Column(Numeric(18, 2))
-    net_income = Column(Numeric(18, 2))
-    operating_cash_flow = Column(Numeric(18, 2))
-    capital_expenditure = Column(Numeric(18, 2))
-    free_cash_flow = Column(Numeric(18, 2))
+    revenue = Column(Numeric(18, 2, asdecimal=False))
+    gross_profit = Column(Numeric(18, 2, asdecimal=False))
+    net_income = Column(Numeric(18, 2, asdecimal=False))
+    operating_cash_flow = Column(Numeric(18, 2, asdecimal=False))
+    capital_expenditure = Column(Numeric(18, 2, asdecimal=False))
+    free_cash_flow = Column(Numeric(18, 2, asdecimal=False))
 
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
-    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), server_onupdate=FetchedValue())
 
     # Relationship
     stock = relationship('Stock', back_populates='quarterly_fundamentals')
@@ -130,6 +149,10 @@ class QuarterlyFundamental(Base):
     __table_args__ = (
         CheckConstraint('fiscal_quarter BETWEEN 1 AND 4', name='chk_fiscal_quarter'),
         UniqueConstraint('stock_id', 'fiscal_year', 'fiscal_quarter', name='uq_quarterly_stock_period'),
+        # Covers "metric series for one stock" with an index-only scan
+        Index('idx_quarterly_stock_metrics', 'stock_id', 'fiscal_year', 'fiscal_quarter',
+              postgresql_include=['quarter_end_date', 'revenue', 'gross_profit', 'net_income',
+                                  'operating_cash_flow', 'free_cash_flow']),
     )
 
     def __repr__(self):
@@ -146,15 +169,15 @@ class AnnualFundamental(Base):
     year_end_date = Column(Date, nullable=False)
 
     # Financial Metrics
-    revenue = Column(Numeric(18, 2))
-    gross_profit = Column(Numeric(18, 2))
-    net_income = Column(Numeric(18, 2))
-    operating_cash_flow = Column(Numeric(18, 2))
-    capital_expenditure = Column(Numeric(18, 2))
-    free_cash_flow = Column(Numeric(18, 2))
+    revenue = Column(Numeric(18, 2, asdecimal=False))
+    gross_profit = Column(Numeric(18, 2, asdecimal=False))
+    net_income = Column(Numeric(18, 2, asdecimal=False))
+    operating_cash_flow = Column(Numeric(18, 2, asdecimal=False))
+    capital_expenditure = Column(Numeric(18, 2, asdecimal=False))
+    free_cash_flow = Column(Numeric(18, 2, asdecimal=False))
 
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
-    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), server_onupdate=FetchedValue())
 
     # Relationship
     stock = relationship('Stock', back_populates='annual_fundamentals')
@@ -162,6 +185,10 @@ class AnnualFundamental(Base):
     # Constraints
     __table_args__ = (
         UniqueConstraint('stock_id', 'fiscal_year', name='uq_annual_stock_year'),
+        # Covers "metric series for one stock" with an index-only scan
+        Index('idx_annual_stock_metrics', 'stock_id', 'fiscal_year',
+              postgresql_include=['year_end_date', 'revenue', 'gross_profit', 'net_income',
+                                  'operating_cash_flow', 'free_cash_flow']),
     )
 
     def __repr__(self):
@@ -187,12 +214,56 @@ class DataCollectionLog(Base):
     __table_args__ = (
         CheckConstraint("collection_type IN ('price', 'quarterly', 'annual', 'metadata')", name='chk_collection_type'),
         CheckConstraint("status IN ('success', 'failed', 'partial')", name='chk_status'),
+        # Matches has_recent_collection: one stock and type, newest collections
+        Index('idx_log_stock_type_time', 'stock_id', 'collection_type', 'collection_timestamp'),
     )
 
     def __repr__(self):
         return f"<DataCollectionLog(stock_id={self.stock_id}, type={self.collection_type}, status={self.status})>"
 
 
+# updated_at is maintained by a BEFORE UPDATE trigger (as in schema.sql) rather
+# than an ORM onupdate, so every kind of UPDATE keeps it current without the
+# ORM adding it to the statement. create_tables() installs the triggers too.
+UPDATED_AT_FUNCTION = DDL("""
+CREATE OR REPLACE FUNCTION update_updated_at_column()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ language 'plpgsql'
+""")
+UPDATED_AT_TRIGGER = DDL(
+    "CREATE TRIGGER update_%(table)s_updated_at BEFORE UPDATE ON %(table)s "
+    "FOR EACH ROW EXECUTE FUNCTION update_updated_at_column()"
+)
+
+event.listen(Base.metadata, 'before_create', UPDATED_AT_FUNCTION.execute_if(dialect='postgresql'))
+for _model in (Stock, PriceHistory, QuarterlyFundamental, AnnualFundamental):
+    event.listen(_model.__table__, 'after_create', UPDATED_AT_TRIGGER.execute_if(dialect='postgresql'))
+
+
+# Loader options that fetch the child rows of a whole batch of stocks with one
+# IN query per relationship, instead of one lazy load per stock and relationship
+STOCK_DATA_LOADERS = (
+    selectinload(Stock.price_history),
+    selectinload(Stock.quarterly_fundamentals),
+    selectinload(Stock.annual_fundamentals),
+)
+
+# Hot lookups built once: reusing the same statement objects lets SQLAlchemy
+# reuse their memoized cache keys and compiled SQL instead of rebuilding them
+STOCK_BY_SYMBOL = select(Stock).where(Stock.symbol == bindparam('symbol'))
+STOCK_DATA_BY_SYMBOL = STOCK_BY_SYMBOL.options(*STOCK_DATA_LOADERS)
+RECENT_SUCCESSFUL_COLLECTION = select(DataCollectionLog.id).where(
+    DataCollectionLog.stock_id == bindparam('stock_id'),
+    DataCollectionLog.collection_type == bindparam('collection_type'),
+    DataCollectionLog.status == 'success',
+    DataCollectionLog.collection_timestamp >= bindparam('cutoff_time')
+).limit(1)
+
+
 # ============================================
 # Database Manager Class
 # ============================================
@@ -218,8 +289,11 @@ class DatabaseManager:
                 pool_size=10,
                 max_overflow=20,
                 pool_pre_ping=True,  # Verify connections before using
+                pool_recycle=3600,  # Replace connections older than an hour before the server or a proxy drops them
+                pool_use_lifo=True,  # Reuse the most recent connection so idle extras can be recycled
                 echo=False  # Set to True for SQL query logging
             )
+            event.listen(self.engine, 'connect', _register_numeric_as_float)
             self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
             logger.info("Database engine initialized successfully")
         except Exception as e:
@@ -287,7 +361,7 @@ class DatabaseManager:
             Stock object
         """
         with self.get_session() as session:
-            stock = session.query(Stock).filter(Stock.symbol == symbol).first()
+            stock = session.execute(STOCK_BY_SYMBOL, {'symbol': symbol}).scalar_one_or_none()
 
             if stock:
                 # Update existing stock
@@ -322,7 +396,7 @@ class DatabaseManager:
     def get_stock_by_symbol(self, symbol: str) -> Optional[Stock]:
         """Get stock by symbol."""
         with self.get_session() as session:
-            return session.query(Stock).filter(Stock.symbol == symbol).first()
+            return session.execute(STOCK_BY_SYMBOL, {'symbol': symbol}).scalar_one_or_none()
 
     def get_all_stocks(self, active_only: bool = True) -> List[Stock]:
         """Get all stocks, optionally filtering by active status."""
@@ -510,14 +584,13 @@ class DatabaseManager:
             from datetime import timedelta
             cutoff_time = datetime.now() - timedelta(hours=hours)
 
-            log = session.query(DataCollectionLog).filter(
-                DataCollectionLog.stock_id == stock_id,
-                DataCollectionLog.collection_type == collection_type,
-                DataCollectionLog.status == 'success',
-                DataCollectionLog.collection_timestamp >= cutoff_time
-            ).first()
+            log_id = session.execute(RECENT_SUCCESSFUL_COLLECTION, {
+                'stock_id': stock_id,
+                'collection_type': collection_type,
+                'cutoff_time': cutoff_time
+            }).scalar()
 
-            return log is not None
+            return log_id is not None
 
     # ============================================
     # Query Methods for Exports
@@ -529,7 +602,7 @@ class DatabaseManager:
         Returns a list of dictionaries containing all stock data.
         """
         with self.get_session() as session:
-            stocks = session.query(Stock).filter(Stock.is_active == True).all()
+            stocks = session.query(Stock).options(*STOCK_DATA_LOADERS).filter(Stock.is_active == True).all()
             export_data = []
 
             for stock in stocks:
@@ -596,6 +669,29 @@ class DatabaseManager:
     # Bulk Save Operations
     # ============================================
 
+    @staticmethod
+    def _upsert_rows(session: Session, model, rows: List[Dict[str, Any]], key_columns: Tuple[str, ...]):
+        """
+        Insert rows, updating any that already exist, as one batched INSERT ... ON CONFLICT.
+
+        The rows go through SQLAlchemy's insertmanyvalues batching, so they are
+        sent as multi-row VALUES statements instead of a SELECT plus an INSERT
+        or UPDATE per row.
+
+        Args:
+            session: Session whose transaction the statement joins
+            model: Model class to write to
+            rows: Column values per row (every row with the same keys)
+            key_columns: Columns of the unique constraint identifying a row
+        """
+        if not rows:
+            return
+
+        stmt = pg_insert(model)
+        update_columns = {name: stmt.excluded[name] for name in rows[0] if name not in key_columns}
+        update_columns['updated_at'] = func.now()
+        session.execute(stmt.on_conflict_do_update(index_elements=key_columns, set_=update_columns), rows)
+
     def save_collected_data(self, symbol: str, collected_data: Dict[str, Any], exchange: str = 'Tadawul') -> bool:
         """
         Save all data collected by StockCollector in one transaction.
@@ -610,36 +706,23 @@ class DatabaseManager:
         """
         try:
             with self.get_session() as session:
-                # 1. Upsert stock metadata
+                # 1. Upsert stock metadata, getting its id back from the same statement
                 stock_info = collected_data.get('stock_info', {})
-                stock = session.query(Stock).filter(Stock.symbol == symbol).first()
-
-                if stock:
-                    # Update existing
-                    if stock_info.get('company_name'):
-                        stock.company_name = stock_info['company_name']
-                    if stock_info.get('sector'):
-                        stock.sector = stock_info['sector']
-                    if stock_info.get('industry'):
-                        stock.industry = stock_info['industry']
-                    if exchange:
-                        stock.exchange = exchange
-                    logger.debug(f"Updated stock metadata: {symbol}")
-                else:
-                    # Insert new
-                    stock = Stock(
-                        symbol=symbol,
-                        company_name=stock_info.get('company_name'),
-                        sector=stock_info.get('sector'),
-                        industry=stock_info.get('industry'),
-                        exchange=exchange,
-                        currency=stock_info.get('currency', 'SAR')
-                    )
-                    session.add(stock)
-                    logger.info(f"Inserted new stock: {symbol}")
-
-                session.flush()
-                stock_id = stock.id
+                stmt = pg_insert(Stock).values(
+                    symbol=symbol,
+                    company_name=stock_info.get('company_name') or None,
+                    sector=stock_info.get('sector') or None,
+                    industry=stock_info.get('industry') or None,
+                    exchange=exchange or None,
+                    currency=stock_info.get('currency', 'SAR')
+                )
+                # An existing stock keeps any metadata field that was not collected this time
+                update_columns = {name: func.coalesce(stmt.excluded[name], getattr(Stock, name))
+                                  for name in ('company_name', 'sector', 'industry', 'exchange')}
+                update_columns['updated_at'] = func.now()
+                stmt = stmt.on_conflict_do_update(index_elements=['symbol'], set_=update_columns)
+                stock_id = session.execute(stmt.returning(Stock.id)).scalar_one()
+                logger.debug(f"Saved stock metadata: {symbol}")
 
                 # 2. Upsert price data
                 current_price = collected_data.get('current_price', {})
@@ -652,52 +735,30 @@ class DatabaseManager:
                     if isinstance(data_date, str):
                         data_date = date.fromisoformat(data_date)
 
-                    price_rec = session.query(PriceHistory).filter(
-                        PriceHistory.stock_id == stock_id,
-                        PriceHistory.data_date == data_date
-                    ).first()
-
-                    if price_rec:
-                        # Update
-                        price_rec.last_close_price = current_price.get('last_close_price')
-                        price_rec.price_1m_ago = historical_prices.get(1)
-                        price_rec.price_3m_ago = historical_prices.get(3)
-                        price_rec.price_6m_ago = historical_prices.get(6)
-                        price_rec.price_9m_ago = historical_prices.get(9)
-                        price_rec.price_12m_ago = historical_prices.get(12)
-                        price_rec.week_52_high = high_low.get('week_52_high')
-                        price_rec.week_52_low = high_low.get('week_52_low')
-                        price_rec.year_3_high = high_low.get('year_3_high')
-                        price_rec.year_3_low = high_low.get('year_3_low')
-                        price_rec.year_5_high = high_low.get('year_5_high')
-                        price_rec.year_5_low = high_low.get('year_5_low')
-                        logger.debug(f"Updated price history for {symbol}")
-                    else:
-                        # Insert
-                        price_rec = PriceHistory(
-                            stock_id=stock_id,
-                            data_date=data_date,
-                            last_close_price=current_price.get('last_close_price'),
-                            price_1m_ago=historical_prices.get(1),
-                            price_3m_ago=historical_prices.get(3),
-                            price_6m_ago=historical_prices.get(6),
-                            price_9m_ago=historical_prices.get(9),
-                            price_12m_ago=historical_prices.get(12),
-                            week_52_high=high_low.get('week_52_high'),
-                            week_52_low=high_low.get('week_52_low'),
-                            year_3_high=high_low.get('year_3_high'),
-                            year_3_low=high_low.get('year_3_low'),
-                            year_5_high=high_low.get('year_5_high'),
-                            year_5_low=high_low.get('year_5_low')
-                        )
-                        session.add(price_rec)
-                        logger.info(f"Inserted price history for {symbol}")
+                    self._upsert_rows(session, PriceHistory, [{
+                        'stock_id': stock_id,
+                        'data_date': data_date,
+                        'last_close_price': current_price.get('last_close_price'),
+                        'price_1m_ago': historical_prices.get(1),
+                        'price_3m_ago': historical_prices.get(3),
+                        'price_6m_ago': historical_prices.get(6),
+                        'price_9m_ago': historical_prices.get(9),
+                        'price_12m_ago': historical_prices.get(12),
+                        'week_52_high': high_low.get('week_52_high'),
+                        'week_52_low': high_low.get('week_52_low'),
+                        'year_3_high': high_low.get('year_3_high'),
+                        'year_3_low': high_low.get('year_3_low'),
+                        'year_5_high': high_low.get('year_5_high'),
+                        'year_5_low': high_low.get('year_5_low')
+                    }], ('stock_id', 'data_date'))
+                    logger.debug(f"Saved price history for {symbol}")
 
                 # 3. Upsert quarterly fundamentals
                 quarterly_data = collected_data.get('quarterly_fundamentals', [])
 
                 # Deduplicate by (fiscal_year, fiscal_quarter), keeping most recent quarter_end_date
-                # (Yahoo Finance sometimes returns duplicate quarters)
+                # (Yahoo Finance sometimes returns duplicate quarters, and one upsert
+                # statement cannot touch the same row twice)
                 seen_quarters = {}
                 for quarter in quarterly_data:
                     key = (quarter['fiscal_year'], quarter['fiscal_quarter'])
@@ -712,40 +773,17 @@ class DatabaseManager:
 
                 quarterly_data = list(seen_quarters.values())
 
-                for quarter in quarterly_data:
-                    from datetime import date
-                    quarter_end = quarter['quarter_end_date']
-                    if isinstance(quarter_end, str):
-                        quarter_end = date.fromisoformat(quarter_end)
-
-                    qf = session.query(QuarterlyFundamental).filter(
-                        QuarterlyFundamental.stock_id == stock_id,
-                        QuarterlyFundamental.fiscal_year == quarter['fiscal_year'],
-                        QuarterlyFundamental.fiscal_quarter == quarter['fiscal_quarter']
-                    ).first()
-
-                    if qf:
-                        # Update
-                        qf.quarter_end_date = quarter_end
-                        qf.revenue = quarter.get('revenue')
-                        qf.gross_profit = quarter.get('gross_profit')
-                        qf.net_income = quarter.get('net_income')
-                        qf.operating_cash_flow = quarter.get('operating_cash_flow')
-                        qf.free_cash_flow = quarter.get('free_cash_flow')
-                    else:
-                        # Insert
-                        qf = QuarterlyFundamental(
-                            stock_id=stock_id,
-                            fiscal_year=quarter['fiscal_year'],
-                            fiscal_quarter=quarter['fiscal_quarter'],
-                            quarter_end_date=quarter_end,
-                            revenue=quarter.get('revenue'),
-                            gross_profit=quarter.get('gross_profit'),
-                            net_income=quarter.get('net_income'),
-                            operating_cash_flow=quarter.get('operating_cash_flow'),
-                            free_cash_flow=quarter.get('free_cash_flow')
-                        )
-                        session.add(qf)
+                self._upsert_rows(session, QuarterlyFundamental, [{
+                    'stock_id': stock_id,
+                    'fiscal_year': quarter['fiscal_year'],
+                    'fiscal_quarter': quarter['fiscal_quarter'],
+                    'quarter_end_date': quarter['quarter_end_date'],
+                    'revenue': quarter.get('revenue'),
+                    'gross_profit': quarter.get('gross_profit'),
+                    'net_income': quarter.get('net_income'),
+                    'operating_cash_flow': quarter.get('operating_cash_flow'),
+                    'free_cash_flow': quarter.get('free_cash_flow')
+                } for quarter in quarterly_data], ('stock_id', 'fiscal_year', 'fiscal_quarter'))
 
                 logger.info(f"Saved {len(quarterly_data)} quarterly records for {symbol}")
 
@@ -768,38 +806,16 @@ class DatabaseManager:
 
                 annual_data = list(seen_years.values())
 
-                for year in annual_data:
-                    from datetime import date
-                    year_end = year['year_end_date']
-                    if isinstance(year_end, str):
-                        year_end = date.fromisoformat(year_end)
-
-                    af = session.query(AnnualFundamental).filter(
-                        AnnualFundamental.stock_id == stock_id,
-                        AnnualFundamental.fiscal_year == year['fiscal_year']
-                    ).first()
-
-                    if af:
-                        # Update
-                        af.year_end_date = year_end
-                        af.revenue = year.get('revenue')
-                        af.gross_profit = year.get('gross_profit')
-                        af.net_income = year.get('net_income')
-                        af.operating_cash_flow = year.get('operating_cash_flow')
-                        af.free_cash_flow = year.get('free_cash_flow')
-                    else:
-                        # Insert
-                        af = AnnualFundamental(
-                            stock_id=stock_id,
-                            fiscal_year=year['fiscal_year'],
-                            year_end_date=year_end,
-                            revenue=year.get('revenue'),
-                            gross_profit=year.get('gross_profit'),
-                            net_income=year.get('net_income'),
-                            operating_cash_flow=year.get('operating_cash_flow'),
-                            free_cash_flow=year.get('free_cash_flow')
-                        )
-                        session.add(af)
+                self._upsert_rows(session, AnnualFundamental, [{
+                    'stock_id': stock_id,
+                    'fiscal_year': year['fiscal_year'],
+                    'year_end_date': year['year_end_date'],
+                    'revenue': year.get('revenue'),
+                    'gross_profit': year.get('gross_profit'),
+                    'net_income': year.get('net_income'),
+                    'operating_cash_flow': year.get('operating_cash_flow'),
+                    'free_cash_flow': year.get('free_cash_flow')
+                } for year in annual_data], ('stock_id', 'fiscal_year'))
 
                 logger.info(f"Saved {len(annual_data)} annual records for {symbol}")
 
@@ -819,6 +835,88 @@ class DatabaseManager:
             logger.error(f"Failed to save data for {symbol}: {e}", exc_info=True)
             return False
 
+    @staticmethod
+    def _stock_export(stock: Stock) -> Dict[str, Any]:
+        """
+        Build the export dictionary for one stock from its loaded relationships.
+
+        Args:
+            stock: Stock with price history and fundamentals loaded (see STOCK_DATA_LOADERS)
+
+        Returns:
+            Dict with all stock data, fundamentals newest first
+        """
+        export_data = {
+            'stock_info': {
+                'symbol': stock.symbol,
+                'company_name': stock.company_name,
+                'exchange': stock.exchange,
+                'sector': stock.sector,
+                'industry': stock.industry,
+                'currency': stock.currency,
+                'listing_date': stock.listing_date,
+                'created_at': stock.created_at,
+                'updated_at': stock.updated_at
+            },
+            'price_history': [],
+            'quarterly_fundamentals': [],
+            'annual_fundamentals': []
+        }
+
+        # Price history
+        for price in stock.price_history:
+            export_data['price_history'].append({
+                'data_date': price.data_date,
+                'last_close_price': price.last_close_price,
+                'price_1m_ago': price.price_1m_ago,
+                'price_3m_ago': price.price_3m_ago,
+                'price_6m_ago': price.price_6m_ago,
+                'price_9m_ago': price.price_9m_ago,
+                'price_12m_ago': price.price_12m_ago,
+                'week_52_high': price.week_52_high,
+                'week_52_low': price.week_52_low,
+                'year_3_high': price.year_3_high,
+                'year_3_low': price.year_3_low,
+                'year_5_high': price.year_5_high,
+                'year_5_low': price.year_5_low,
+                'created_at': price.created_at,
+                'updated_at': price.updated_at
+            })
+
+        # Quarterly fundamentals, newest first
+        quarterlies = sorted(stock.quarterly_fundamentals,
+                             key=lambda q: (q.fiscal_year, q.fiscal_quarter), reverse=True)
+        for q in quarterlies:
+            export_data['quarterly_fundamentals'].append({
+                'fiscal_year': q.fiscal_year,
+                'fiscal_quarter': q.fiscal_quarter,
+                'quarter_end_date': q.quarter_end_date,
+                'revenue': q.revenue,
+                'gross_profit': q.gross_profit,
+                'net_income': q.net_income,
+                'operating_cash_flow': q.operating_cash_flow,
+                'free_cash_flow': q.free_cash_flow,
+                'created_at': q.created_at,
+                'updated_at': q.updated_at
+            })
+
+        # Annual fundamentals, newest first
+        annuals = sorted(stock.annual_fundamentals, key=lambda a: a.fiscal_year, reverse=True)
+        for a in annuals:
+            export_data['annual_fundamentals'].append({
+                'fiscal_year': a.fiscal_year,
+                'year_end_date': a.year_end_date,
+                'revenue': a.revenue,
+                'gross_profit': a.gross_profit,
+                'net_income': a.net_income,
+                'operating_cash_flow': a.operating_cash_flow,
+                'free_cash_flow': a.free_cash_flow,
+                'created_at': a.created_at,
+                'updated_at': a.updated_at
+            })
+
+        return export_data
+
     def export_stock_data(self, symbol: str) -> Optional[Dict[str, Any]]:
         """
         Export all data for a stock in dictionary format.
@@ -831,89 +929,13 @@ class DatabaseManager:
         """
         try:
             with self.get_session() as session:
-                # Get stock
-                stock = session.query(Stock).filter(Stock.symbol == symbol).first()
+                stock = session.execute(STOCK_DATA_BY_SYMBOL, {'symbol': symbol}).scalar_one_or_none()
 
                 if not stock:
                     logger.warning(f"Stock {symbol} not found for export")
                     return None
 
-                # Build export data
-                export_data = {
-                    'stock_info': {
-                        'symbol': stock.symbol,
-                        'company_name': stock.company_name,
-                        'exchange': stock.exchange,
-                        'sector': stock.sector,
-                        'industry': stock.industry,
-                        'currency': stock.currency,
-                        'listing_date': stock.listing_date,
-                        'created_at': stock.created_at,
-                        'updated_at': stock.updated_at
-                    },
-                    'price_history': [],
-                    'quarterly_fundamentals': [],
-                    'annual_fundamentals': []
-                }
-
-                # Get price history
-                prices = session.query(PriceHistory).filter(PriceHistory.stock_id == stock.id).all()
-                for price in prices:
-                    export_data['price_history'].append({
-                        'data_date': price.data_date,
-                        'last_close_price': price.last_close_price,
-                        'price_1m_ago': price.price_1m_ago,
-                        'price_3m_ago': price.price_3m_ago,
-                        'price_6m_ago': price.price_6m_ago,
-                        'price_9m_ago': price.price_9m_ago,
-                        'price_12m_ago': price.price_12m_ago,
-                        'week_52_high': price.week_52_high,
-                        'week_52_low': price.week_52_low,
-                        'year_3_high': price.year_3_high,
-                        'year_3_low': price.year_3_low,
-                        'year_5_high': price.year_5_high,
-                        'year_5_low': price.year_5_low,
-                        'created_at': price.created_at,
-                        'updated_at': price.updated_at
-                    })
-
-                # Get quarterly fundamentals
-                quarterlies = session.query(QuarterlyFundamental).filter(
-                    QuarterlyFundamental.stock_id == stock.id
-                ).order_by(QuarterlyFundamental.fiscal_year.desc(),
-                          QuarterlyFundamental.fiscal_quarter.desc()).all()
-
-                for q in quarterlies:
-                    export_data['quarterly_fundamentals'].append({
-                        'fiscal_year': q.fiscal_year,
-                        'fiscal_quarter': q.fiscal_quarter,
-                        'quarter_end_date': q.quarter_end_date,
-                        'revenue': q.revenue,
-                        'gross_profit': q.gross_profit,
-                        'net_income': q.net_income,
-                        'operating_cash_flow': q.operating_cash_flow,
-                        'free_cash_flow': q.free_cash_flow,
-                        'created_at': q.created_at,
-                        'updated_at': q.updated_at
-                    })
-
-                # Get annual fundamentals
-                annuals = session.query(AnnualFundamental).filter(
-                    AnnualFundamental.stock_id == stock.id
-                ).order_by(AnnualFundamental.fiscal_year.desc()).all()
-
-                for a in annuals:
-                    export_data['annual_fundamentals'].append({
-                        'fiscal_year': a.fiscal_year,
-                        'year_end_date': a.year_end_date,
-                        'revenue': a.revenue,
-                        'gross_profit': a.gross_profit,
-                        'net_income': a.net_income,
-                        'operating_cash_flow': a.operating_cash_flow,
-                        'free_cash_flow': a.free_cash_flow,
-                        'created_at': a.created_at,
-                        'updated_at': a.updated_at
-                    })
+                export_data = self._stock_export(stock)
 
                 logger.info(f"Exported data for {symbol}: {len(export_data['price_history'])} price records, "
                           f"{len(export_data['quarterly_fundamentals'])} quarterly, "
@@ -925,6 +947,28 @@ class DatabaseManager:
             logger.error(f"Failed to export data for {symbol}: {e}", exc_info=True)
             return None
 
+    def export_all_stock_data(self) -> List[Dict[str, Any]]:
+        """
+        Export all data for every stock, in the export_stock_data format.
+
+        All stocks and their child rows are loaded with four queries in total,
+        however many stocks there are.
+
+        Returns:
+            List of stock data dicts (empty if the export failed)
+        """
+        try:
+            with self.get_session() as session:
+                stocks = session.query(Stock).options(*STOCK_DATA_LOADERS).all()
+                export_data = [self._stock_export(stock) for stock in stocks]
+
+                logger.info(f"Exported data for {len(export_data)} stocks")
+                return export_data
+
+        except Exception as e:
+            logger.error(f"Failed to export stock data: {e}", exc_info=True)
+            return []
+
     def test_connection(self) -> bool:
         """Test database connection."""
         try:
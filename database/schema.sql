@@ -79,7 +79,8 @@ CREATE TABLE price_history (
 
 -- Indexes for price_history table
 CREATE INDEX idx_price_stock_id ON price_history(stock_id);
-CREATE INDEX idx_price_data_date ON price_history(data_date);
+-- Snapshots are appended in date order, so BRIN covers date-range scans cheaply
+CREATE INDEX idx_price_data_date ON price_history USING BRIN (data_date);
 
 COMMENT ON TABLE price_history IS 'Historical price data including lookback periods and high/low ranges';
 COMMENT ON COLUMN price_history.data_date IS 'Date when this price snapshot was taken';
@@ -111,6 +112,9 @@ CREATE TABLE quarterly_fundamentals (
 CREATE INDEX idx_quarterly_stock_id ON quarterly_fundamentals(stock_id);
 CREATE INDEX idx_quarterly_fiscal_year ON quarterly_fundamentals(fiscal_year);
 CREATE INDEX idx_quarterly_period ON quarterly_fundamentals(fiscal_year, fiscal_quarter);
+-- Covers "metric series for one stock" with an index-only scan
+CREATE INDEX idx_quarterly_stock_metrics ON quarterly_fundamentals(stock_id, fiscal_year, fiscal_quarter)
+    INCLUDE (quarter_end_date, revenue, gross_profit, net_income, operating_cash_flow, free_cash_flow);
 
 COMMENT ON TABLE quarterly_fundamentals IS 'Quarterly financial fundamentals for last 5 years';
 COMMENT ON COLUMN quarterly_fundamentals.fiscal_quarter IS 'Quarter number: 1=Q1, 2=Q2, 3=Q3, 4=Q4';
@@ -141,6 +145,9 @@ CREATE TABLE annual_fundamentals (
 -- Indexes for annual_fundamentals table
 CREATE INDEX idx_annual_stock_id ON annual_fundamentals(stock_id);
 CREATE INDEX idx_annual_fiscal_year ON annual_fundamentals(fiscal_year);
+-- Covers "metric series for one stock" with an index-only scan
+CREATE INDEX idx_annual_stock_metrics ON annual_fundamentals(stock_id, fiscal_year)
+    INCLUDE (year_end_date, revenue, gross_profit, net_income, operating_cash_flow, free_cash_flow);
 
 COMMENT ON TABLE annual_fundamentals IS 'Annual financial fundamentals for last 5 years';
 COMMENT ON COLUMN annual_fundamentals.year_end_date IS 'Fiscal year end date';
@@ -166,6 +173,8 @@ CREATE INDEX idx_log_stock_id ON data_collection_log(stock_id);
 CREATE INDEX idx_log_timestamp ON data_collection_log(collection_timestamp);
 CREATE INDEX idx_log_status ON data_collection_log(status);
 CREATE INDEX idx_log_collection_type ON data_collection_log(collection_type);
+-- Matches the "recent successful collection for a stock" lookup
+CREATE INDEX idx_log_stock_type_time ON data_collection_log(stock_id, collection_type, collection_timestamp);
 
 COMMENT ON TABLE data_collection_log IS 'Audit trail for data collection operations';
 COMMENT ON COLUMN data_collection_log.collection_type IS 'Type of data collected: price, quarterly, annual, metadata';
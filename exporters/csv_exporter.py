@@ -4,12 +4,16 @@ Exports stock data to CSV format (4 separate files).
 """
 
 import pandas as pd
+from itertools import islice
 from pathlib import Path
 from typing import List, Optional
 from utils import get_logger
 
 logger = get_logger(__name__)
 
+# Rows fetched per round trip and written per CSV chunk when streaming large tables
+EXPORT_BATCH_SIZE = 1000
+
 
 class CSVExporter:
     """
@@ -122,21 +126,27 @@ class CSVExporter:
                     PriceHistory.year_5_low,
                     PriceHistory.created_at,
                     PriceHistory.updated_at
-                ).join(Stock, PriceHistory.stock_id == Stock.id).all()
+                ).join(Stock, PriceHistory.stock_id == Stock.id).yield_per(EXPORT_BATCH_SIZE)
 
-                # Convert to DataFrame
-                df = pd.DataFrame(query, columns=[
+                columns = [
                     'symbol', 'company_name', 'exchange', 'data_date',
                     'last_close_price', 'price_1m_ago', 'price_3m_ago',
                     'price_6m_ago', 'price_9m_ago', 'price_12m_ago',
                     'week_52_high', 'week_52_low', 'year_3_high', 'year_3_low',
                     'year_5_high', 'year_5_low', 'created_at', 'updated_at'
-                ])
-
-                # Export to CSV
-                df.to_csv(output_path, index=False, encoding='utf-8')
-
-                logger.info(f"Exported {len(df)} price records to {output_path}")
+                ]
+
+                # Stream rows from a server-side cursor and write them batch by
+                # batch, so memory stays bounded however long the history gets
+                rows = iter(query)
+                record_count = 0
+                with open(output_path, 'w', encoding='utf-8', newline='') as f:
+                    pd.DataFrame(columns=columns).to_csv(f, index=False)
+                    for batch in iter(lambda: list(islice(rows, EXPORT_BATCH_SIZE)), []):
+                        pd.DataFrame(batch, columns=columns).to_csv(f, index=False, header=False)
+                        record_count += len(batch)
+
+                logger.info(f"Exported {record_count} price records to {output_path}")
                 return str(output_path)
 
         except Exception as e:
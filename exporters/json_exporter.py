@@ -161,24 +161,10 @@ class JSONExporter:
         """
         logger.info("Exporting all stocks from database to JSON")
 
-        from database.db_manager import Stock
-
-        # Get all stock symbols
-        with db_manager.get_session() as session:
-            stocks = session.query(Stock).all()
-            symbols = [stock.symbol for stock in stocks]
-
-        logger.info(f"Found {len(symbols)} stocks in database")
-
-        # Export each stock
-        all_stocks_data = []
-        for symbol in symbols:
-            try:
-                stock_data = db_manager.export_stock_data(symbol)
-                if stock_data:
-                    all_stocks_data.append(stock_data)
-            except Exception as e:
-                logger.error(f"Failed to export {symbol}: {e}")
+        # All stocks and their child rows in a handful of queries
+        all_stocks_data = db_manager.export_all_stock_data()
+
+        logger.info(f"Found {len(all_stocks_data)} stocks in database")
 
         # Write to file
         return self.export_multiple_stocks(all_stocks_data, filename)
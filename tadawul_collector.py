@@ -4,19 +4,19 @@ Main application for collecting stock data from Tadawul and NOMU markets.
 """
 
 import argparse
+import asyncio
 import sys
 from pathlib import Path
 from tqdm import tqdm
 from typing import List, Set
-import time
 
-from collectors.stock_collector import StockCollector
+from collectors.stock_collector import collect_many, CONCURRENCY_LIMIT, RATE_LIMIT_BURST, close_session
 from collectors.argaam_scraper import ArgaamScraper
 from database.db_manager import DatabaseManager
 from validators.data_validator import DataValidator
 from exporters.json_exporter import JSONExporter
 from exporters.csv_exporter import CSVExporter
-from utils import setup_logger
+from utils import setup_logger, RateLimiter
 
 logger = setup_logger('tadawul_collector', level='INFO')
 
@@ -34,8 +34,16 @@ class TadawulHawk:
     - Export to JSON and CSV
     """
 
-    def __init__(self):
-        """Initialize Tadawul Hawk application."""
+    def __init__(self, force_refresh: bool = False):
+        """
+        Initialize Tadawul Hawk application.
+
+        Args:
+            force_refresh: Ignore cached Yahoo Finance data and fetch everything again
+        """
+        self.force_refresh = force_refresh
+        # Shared by every StockCollector so each new stock does not start with a full burst
+        self.rate_limiter = RateLimiter(0.5, burst=RATE_LIMIT_BURST)
         self.db_manager = DatabaseManager()
         self.validator = DataValidator(tolerance_pct=2.0)
 
@@ -58,13 +66,16 @@ class TadawulHawk:
         """
         logger.info("Fetching all stock symbols...")
 
+        # Both scrapers share one session (and its connections to argaam.com)
+        session = ArgaamScraper.create_session()
+
         # Scrape Tadawul symbols
-        tadawul_scraper = ArgaamScraper(market='tadawul')
+        tadawul_scraper = ArgaamScraper(market='tadawul', session=session)
         tadawul_data = tadawul_scraper.scrape_all_symbols()
         tadawul_symbols = [stock['symbol'] for stock in tadawul_data]
 
         # Scrape NOMU symbols
-        nomu_scraper = ArgaamScraper(market='nomu')
+        nomu_scraper = ArgaamScraper(market='nomu', session=session)
         nomu_data = nomu_scraper.scrape_all_symbols()
         nomu_symbols = [stock['symbol'] for stock in nomu_data]
 
@@ -88,21 +99,22 @@ class TadawulHawk:
             stocks = session.query(Stock.symbol).all()
             return {stock.symbol for stock in stocks}
 
-    def collect_stock_data(self, symbol: str, exchange: str) -> bool:
+    def save_stock_data(self, symbol: str, exchange: str, collected_data) -> bool:
         """
-        Collect data for a single stock.
+        Validate and save the data collected for a single stock.
 
         Args:
             symbol: Stock symbol
             exchange: Exchange market ('Tadawul' or 'NOMU')
+            collected_data: Result of collecting the stock, or the exception
+                            its collection raised
 
         Returns:
             True if successful, False otherwise
         """
         try:
-            # Collect data
-            collector = StockCollector(symbol, rate_limit_delay=0.5)
-            collected_data = collector.collect_all_data()
+            if isinstance(collected_data, Exception):
+                raise collected_data
 
             # Check if we got basic data
             if not collected_data.get('stock_info'):
@@ -164,20 +176,25 @@ class TadawulHawk:
 
         # Progress bar
         with tqdm(total=len(symbols), desc="Collecting stocks", unit="stock") as pbar:
-            for symbol, exchange in symbols:
-                pbar.set_description(f"Collecting {symbol}")
-
-                success = self.collect_stock_data(symbol, exchange)
-
-                if success:
-                    self.stats['success'] += 1
-                else:
-                    self.stats['failed'] += 1
-
-                pbar.update(1)
-
-                # Brief delay between stocks
-                time.sleep(0.2)
+            # Collect a batch of stocks concurrently (paced by the shared rate
+            # limiter), then validate and save them one by one
+            for start in range(0, len(symbols), CONCURRENCY_LIMIT):
+                batch = symbols[start:start + CONCURRENCY_LIMIT]
+                pbar.set_description(f"Collecting {batch[0][0]}" + (f" .. {batch[-1][0]}" if len(batch) > 1 else ""))
+
+                collected = asyncio.run(collect_many(
+                    [symbol for symbol, _ in batch],
+                    force_refresh=self.force_refresh,
+                    rate_limiter=self.rate_limiter
+                ))
+
+                for symbol, exchange in batch:
+                    if self.save_stock_data(symbol, exchange, collected[symbol]):
+                        self.stats['success'] += 1
+                    else:
+                        self.stats['failed'] += 1
+
+                    pbar.update(1)
 
     def run_test_mode(self):
         """Run in test mode - collect data for 3 sample stocks."""
@@ -311,6 +328,9 @@ Examples:
   # Collect with export
   python tadawul_collector.py --all-stocks --export json
   python tadawul_collector.py --resume --export both
+
+  # Re-fetch everything instead of reusing today's cached data
+  python tadawul_collector.py --all-stocks --refresh
         """
     )
 
@@ -339,11 +359,17 @@ Examples:
         help='Export data after collection (optional)'
     )
 
+    parser.add_argument(
+        '--refresh',
+        action='store_true',
+        help='Ignore cached Yahoo Finance data (cache/, kept for 1 day) and fetch again'
+    )
+
     # Parse arguments
     args = parser.parse_args()
 
     # Initialize application
-    app = TadawulHawk()
+    app = TadawulHawk(force_refresh=args.refresh)
 
     try:
         # Run selected mode
@@ -374,6 +400,10 @@ Examples:
         logger.error("Fatal error", exc_info=True)
         sys.exit(1)
 
+    finally:
+        # Release the pooled connections shared by all collectors
+        close_session()
+
 
 if __name__ == '__main__':
     main()
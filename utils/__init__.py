@@ -10,6 +10,9 @@ from .helpers import (
     get_trading_day,
     validate_symbol
 )
+from .cache import cached_frame, cached_record, cached_object, cached_file
+from .rate_limiter import RateLimiter
+from .exports import read_export
 
 __all__ = [
     'setup_logger',
@@ -18,5 +21,11 @@ __all__ = [
     'format_percentage',
     'calculate_percentage_change',
     'get_trading_day',
-    'validate_symbol'
+    'validate_symbol',
+    'cached_frame',
+    'cached_record',
+    'cached_object',
+    'cached_file',
+    'RateLimiter',
+    'read_export'
 ]
\ No newline at end of file
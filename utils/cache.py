@@ -0,0 +1,161 @@
+"""
+On-disk cache for Yahoo Finance fetches.
+Stores fetched data as Parquet, pickle or raw files and reuses them until they expire.
+"""
+
+import os
+import pickle
+import threading
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Optional
+import pandas as pd
+
+CACHE_DIR = Path(__file__).parent.parent / 'cache'
+DEFAULT_TTL = 24 * 60 * 60  # 1 day, in seconds
+
+_locks: Dict[Path, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_for(path: Path) -> threading.Lock:
+    """Get the lock guarding one cache file, so concurrent misses fetch once."""
+    with _locks_guard:
+        return _locks.setdefault(path, threading.Lock())
+
+
+def _is_fresh(path: Path, ttl: float) -> bool:
+    """Check whether a cache file exists and is younger than ttl seconds."""
+    return path.exists() and time.time() - path.stat().st_mtime < ttl
+
+
+def cached_frame(namespace: str, key: str, fetch: Callable[[], Optional[pd.DataFrame]],
+                 ttl: float = DEFAULT_TTL) -> Optional[pd.DataFrame]:
+    """
+    Return a DataFrame from cache/<namespace>/<key>.parquet, fetching it on a miss.
+
+    Args:
+        namespace: Cache subdirectory (e.g. 'valuation')
+        key: File name within the namespace (e.g. the symbol)
+        fetch: Called on a miss or expired entry; must return a DataFrame
+               with string column names
+        ttl: Maximum age of a cached file in seconds
+
+    Returns:
+        Cached or freshly fetched DataFrame (empty results are not cached)
+    """
+    path = CACHE_DIR / namespace / f"{key}.parquet"
+
+    with _lock_for(path):
+        if _is_fresh(path, ttl):
+            return pd.read_parquet(path)
+
+        df = fetch()
+        if df is not None and not df.empty:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            df.to_parquet(path, compression='zstd')
+        return df
+
+
+def cached_record(namespace: str, key: str, fetch: Callable[[], Dict[str, Any]],
+                  ttl: float = DEFAULT_TTL) -> Dict[str, Any]:
+    """
+    Return a flat dict from the cache, stored as a one-row Parquet file.
+
+    Args:
+        namespace: Cache subdirectory
+        key: File name within the namespace
+        fetch: Called on a miss or expired entry
+        ttl: Maximum age of a cached file in seconds
+
+    Returns:
+        Cached or freshly fetched dict (empty fetches are not cached)
+    """
+    fetched: Dict[str, Any] = {}
+
+    def _fetch():
+        fetched.update(fetch())
+        # A fetch that came back without any values is not worth caching
+        return pd.DataFrame([fetched]) if any(fetched.values()) else None
+
+    df = cached_frame(namespace, key, _fetch, ttl)
+    if df is None:
+        return fetched
+
+    record = df.astype(object).iloc[0].to_dict()
+    return {k: None if pd.isna(v) else v for k, v in record.items()}
+
+
+def cached_object(namespace: str, key: str, fetch: Callable[[], Any],
+                  ttl: float = DEFAULT_TTL, force_refresh: bool = False) -> Any:
+    """
+    Return any picklable result from cache/<namespace>/<key>.pkl, fetching it on a miss.
+
+    Used for the nested dicts and lists returned by StockCollector, which do
+    not map onto a single DataFrame.
+
+    Args:
+        namespace: Cache subdirectory (e.g. 'stock_info')
+        key: File name within the namespace (e.g. the symbol)
+        fetch: Called on a miss, an expired entry or a forced refresh
+        ttl: Maximum age of a cached file in seconds
+        force_refresh: Ignore any cached file and fetch again
+
+    Returns:
+        Cached or freshly fetched result (empty results are not cached)
+    """
+    path = CACHE_DIR / namespace / f"{key}.pkl"
+
+    with _lock_for(path):
+        if not force_refresh and _is_fresh(path, ttl):
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+
+        result = fetch()
+        if result:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'wb') as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return result
+
+
+def cached_file(namespace: str, name: str, download: Callable[[BinaryIO], None],
+                ttl: float = DEFAULT_TTL, force_refresh: bool = False) -> Path:
+    """
+    Return the path of cache/<namespace>/<name>, downloading into it on a miss.
+
+    The download writes straight to disk (e.g. a streamed HTTP body), so the
+    content never has to be held in memory; it goes to a temporary file that
+    only replaces the cached one once complete.
+
+    Args:
+        namespace: Cache subdirectory (e.g. 'tadawul_pages')
+        name: File name within the namespace, including any extension
+        download: Called with a binary file to write the content to
+        ttl: Maximum age of a cached file in seconds
+        force_refresh: Ignore any cached file and download again
+
+    Returns:
+        Path of the cached file
+
+    Raises:
+        ValueError: If the download wrote nothing (nothing is cached)
+    """
+    path = CACHE_DIR / namespace / name
+
+    with _lock_for(path):
+        if not force_refresh and _is_fresh(path, ttl):
+            return path
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(path.name + '.part')
+        try:
+            with open(partial, 'wb') as f:
+                download(f)
+            if partial.stat().st_size == 0:
+                raise ValueError(f"Empty download for {namespace}/{name}")
+            os.replace(partial, path)
+        finally:
+            if partial.exists():
+                partial.unlink()
+        return path
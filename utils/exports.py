@@ -0,0 +1,53 @@
+"""
+Readers for the CSV exports.
+Loads export CSVs through a Parquet copy that is rebuilt when the CSV changes.
+"""
+
+from pathlib import Path
+from typing import List
+import pandas as pd
+import pyarrow.parquet as pq
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# Low-cardinality string columns are loaded as categoricals; dates stay
+# plain strings as they are only sorted and echoed into the output
+COLUMN_DTYPES = {'symbol': 'category', 'sector': 'category',
+                 'industry': 'category', 'exchange': 'category',
+                 'quarter_end_date': str, 'balance_sheet_date': str}
+
+
+def read_export(path, columns: List[str]) -> pd.DataFrame:
+    """
+    Read an export CSV, keeping only the wanted columns it has.
+
+    The CSV is parsed with the multithreaded pyarrow engine and cached as a
+    zstd-compressed Parquet file next to it. Later runs, and other consumers
+    of the exports, read the Parquet file (only the wanted columns) for as
+    long as it is at least as new as the CSV.
+
+    Args:
+        path: CSV file path
+        columns: Columns to load; those missing from the file are skipped
+
+    Returns:
+        DataFrame with the available columns
+    """
+    path = Path(path)
+    cache = path.with_suffix('.parquet')
+
+    if cache.exists() and cache.stat().st_mtime >= path.stat().st_mtime:
+        available = set(pq.read_schema(cache).names)
+        return pd.read_parquet(cache, columns=[col for col in columns if col in available])
+
+    header = pd.read_csv(path, nrows=0).columns
+    dtype = {col: col_type for col, col_type in COLUMN_DTYPES.items() if col in header}
+    df = pd.read_csv(path, engine='pyarrow', dtype=dtype)
+
+    try:
+        df.to_parquet(cache, index=False, compression='zstd')
+    except OSError as e:
+        logger.warning(f"Could not write cache {cache}: {e}")
+
+    return df[[col for col in columns if col in df.columns]]
@@ -0,0 +1,55 @@
+"""
+Thread-safe rate limiter for Tadawul Stock Collector.
+Spaces out API calls made from several threads that share one limit.
+"""
+
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Token bucket limiting calls across all threads using it.
+
+    The bucket holds up to `burst` calls and refills one call every
+    min_interval seconds, so short bursts go through without sleeping while
+    the sustained rate stays at one call per min_interval. It is tracked as
+    the theoretical time the next call would be due (GCRA); each call to
+    wait() reserves its slot under a lock, then sleeps outside the lock until
+    that slot arrives. With burst=1 calls are simply spaced min_interval apart.
+    """
+
+    def __init__(self, min_interval: float = 0.5, burst: int = 1):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            min_interval: Seconds per call at the sustained rate (default 0.5s)
+            burst: Calls allowed back to back before spacing applies (default 1)
+        """
+        self.min_interval = min_interval
+        self.burst = burst
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Block until the caller may make its next API call."""
+        with self._lock:
+            now = time.monotonic()
+            due = max(now, self._next_slot)
+            slot = due - (self.burst - 1) * self.min_interval
+            self._next_slot = due + self.min_interval
+
+        if slot > now:
+            time.sleep(slot - now)
+
+    def pause(self, seconds: float):
+        """
+        Hold back every caller for the given time (e.g. after a rate limit error).
+
+        Args:
+            seconds: Time from now before the next call may be made
+        """
+        with self._lock:
+            resume = time.monotonic() + seconds + (self.burst - 1) * self.min_interval
+            self._next_slot = max(self._next_slot, resume)